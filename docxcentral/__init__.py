@@ -25,6 +25,45 @@ from .config import (
     C_REQUIRED_KEYS,
     C_TIMESTAMPS,
     C_GET_RETRY_COUNT,
+    C_RETRY_BACKOFF,
+    C_RETRY_BACKOFF_MAX,
+    C_RETRY_BUDGET,
+    C_CACHE_DIR,
+    C_FIXTURES_DIR,
+    C_DEVICES_DIR,
+    C_DEVICES_MAX_AGE,
+    C_FINGERPRINT_FIELDS,
+    C_QUERY_PROFILES,
+    C_DOWNLOAD_CHUNK_SIZE,
+    C_CACHE_MAX_SIZE,
+    C_CACHE_TTL,
+    C_MEMO_EXCLUDE,
+    C_JOBS,
+    C_PAGE_LIMIT,
+    C_RATE_LIMIT_SECOND,
+    C_POOL_SIZE,
+    C_TOKEN_DIR,
+    C_TOKEN_REFRESH_MARGIN,
+    C_TIMEOUTS,
+    C_HEDGE_PERCENTILE,
+    C_HEDGE_MIN_DELAY,
+    C_HEDGE_MIN_SAMPLES,
+    C_LATENCY_WINDOW,
+    C_ENDPOINT_FAMILIES,
+    C_BREAKER_ERROR_RATE,
+    C_BREAKER_WINDOW,
+    C_BREAKER_MIN_REQUESTS,
+    C_BREAKER_COOLDOWN,
+    C_BUDGET_DIR,
+    C_API_DAILY_BUDGET,
+    C_BUDGET_FLUSH_CALLS,
+    C_DOCX_STYLES,
+    C_IMAGES_DIR,
+    C_IMAGE_CACHE_DIR,
+    C_IMAGE_WIDTH_PHOTO,
+    C_IMAGE_WIDTH_LOCATION,
+    C_IMAGE_DPI,
+    C_IMAGE_QUALITY,
 )
 
 try:
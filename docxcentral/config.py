@@ -20,11 +20,38 @@ C_LOG_DIR = "log/"  #''' Log directory '''
 C_DATA_DIR = "data/"  #''' Data directory '''
 C_DOCX_DIR = "docx/"
 C_BOM_DIR = "bom/"
+C_IMAGES_DIR = "images/"  # AP photos and location images, one directory per site
+C_TOKEN_DIR = "token"  # Aruba Central access token store
 #
 # Default MS Word Template
 #
 C_TEMPLATE_DOCX = "template/template.docx"
 #
+# Template styles used in documents. Checked before any API request.
+#
+C_STYLE_TITLE = "Aruba Cover: Main title Orange Arial Bold 36pt"
+C_STYLE_SUBTITLE = "Aruba Cover: Subheading CAPS Dark Blue Arial 20pt"
+C_STYLE_HEADING = "Aruba body Quote text 2 Orange Arial 16pt"
+C_STYLE_ROWHEAD = "Table Rowhead 8 pt"
+C_STYLE_BODY = "Table Body 8pt"
+C_STYLE_TABLE = "Table Grid"
+C_DOCX_STYLES = [
+    C_STYLE_TITLE,
+    C_STYLE_SUBTITLE,
+    C_STYLE_HEADING,
+    C_STYLE_ROWHEAD,
+    C_STYLE_BODY,
+    C_STYLE_TABLE,
+]
+#
+# Print width (cm) of AP photos and location images. Images are downsampled
+# to C_IMAGE_DPI for print width and JPEG saved with C_IMAGE_QUALITY.
+#
+C_IMAGE_WIDTH_PHOTO = 7.5
+C_IMAGE_WIDTH_LOCATION = 13
+C_IMAGE_DPI = 200
+C_IMAGE_QUALITY = 85
+#
 # Default CSV parameters
 #
 C_CSV_FILENAME = "input.csv"  #''' CSV input filename '''
@@ -61,4 +88,181 @@ C_REQUIRED_KEYS = ["central_info", "debug_command", "event_file"]
 #
 C_TIMESTAMPS = ["from_timestamp", "to_timestamp"]
 #
-C_GET_RETRY_COUNT = 20
+C_GET_RETRY_COUNT = 20  # Maximum retries for one request
+#
+# Retry backoff. Delay is random between 0 and
+# min(C_RETRY_BACKOFF_MAX, C_RETRY_BACKOFF * 2 ** attempt) seconds
+#
+C_RETRY_BACKOFF = 1.0
+C_RETRY_BACKOFF_MAX = 60.0
+#
+# Maximum number of retries for all requests in one run
+#
+C_RETRY_BUDGET = 200
+#
+# Response cache for GET requests. Cache is stored in C_DATA_DIR/C_CACHE_DIR.
+# TTL in seconds per REST API path prefix, longest prefix wins.
+# Endpoints not listed are not cached.
+#
+C_CACHE_DIR = "cache/"
+C_FIXTURES_DIR = "fixtures/"  # Recorded API responses for replay
+C_DEVICES_DIR = "devices/"  # AP details kept for incremental runs
+C_DEVICES_MAX_AGE = 7 * 24 * 3600  # seconds, older AP details are refetched
+C_IMAGE_CACHE_DIR = "images/"  # Downsampled AP photos and location images
+#
+# Floor plan images are downloaded and decoded in chunks of this size
+#
+C_DOWNLOAD_CHUNK_SIZE = 65536
+#
+# /monitoring/v2/aps fields that change when AP details have to be refetched
+# in incremental runs
+#
+C_FINGERPRINT_FIELDS = [
+    "last_modified",
+    "firmware_version",
+    "group_name",
+    "site",
+    "name",
+    "labels",
+    "ip_address",
+    "mesh_role",
+]
+#
+# /monitoring/v2/aps query profiles
+#
+#   params: query parameters added to the request
+#   fields: fields kept from each AP record, None keeps the value as is,
+#           dictionary projects the list of radios
+#
+#   index: AP identity, e.g. names and sites in device inventory
+#   full:  everything site documents need
+#
+C_QUERY_PROFILES = {
+    "index": {
+        "params": {"calculate_totals": "true"},
+        "fields": {
+            "name": None,
+            "serial": None,
+            "site": None,
+            "group_name": None,
+        },
+    },
+    "full": {
+        "params": {"calculate_totals": "true", "calculate_ssid_count": "true"},
+        "fields": {
+            "name": None,
+            "serial": None,
+            "site": None,
+            "group_name": None,
+            "model": None,
+            "labels": None,
+            "macaddr": None,
+            "mesh_role": None,
+            "ip_address": None,
+            "public_ip_address": None,
+            "firmware_version": None,
+            "ssid_count": None,
+            "notes": None,
+            "last_modified": None,
+            "radios": {
+                "index": None,
+                "macaddr": None,
+                "radio_name": None,
+                "radio_type": None,
+                "spatial_stream": None,
+                "tx_power": None,
+            },
+        },
+    },
+}
+C_CACHE_MAX_SIZE = 512 * 1024 * 1024  # bytes
+C_CACHE_TTL = {
+    "/configuration/v2/groups": 24 * 3600,
+    "/configuration/full_wlan/": 24 * 3600,
+    "/configuration/v1/dot11a_radio_profiles/": 24 * 3600,
+    "/configuration/v1/ap_settings_cli/": 12 * 3600,
+    "/configuration/v1/devices/": 12 * 3600,
+    "/central/v2/sites": 12 * 3600,
+    "/platform/device_inventory/v1/devices": 12 * 3600,
+    "/platform/licensing/v1/subscriptions": 12 * 3600,
+    "/visualrf_api/v1/": 24 * 3600,
+    "/monitoring/v2/aps": 15 * 60,
+}
+#
+# Responses of these REST API path prefixes are not kept by RequestMemo for
+# the run. AP lists are large and are requested once per site.
+#
+C_MEMO_EXCLUDE = ["/monitoring/v2/aps"]
+#
+# Number of concurrent Aruba Central API requests
+#
+C_JOBS = 8
+#
+# Page size for paginated Aruba Central list endpoints
+#
+C_PAGE_LIMIT = 1000
+#
+# Initial Aruba Central per-second API rate limit. Adjusted from
+# X-RateLimit-* response headers during the run.
+#
+C_RATE_LIMIT_SECOND = 7
+#
+# Keep-alive connections per Aruba Central host
+#
+C_POOL_SIZE = 16
+#
+# Refresh access token this many seconds before it expires
+#
+C_TOKEN_REFRESH_MARGIN = 300
+#
+# (connect, read) timeouts in seconds per endpoint class. Longest prefix
+# wins, "" is the default.
+#
+C_TIMEOUTS = {
+    "": (5, 30),
+    "/configuration/v1/ap_settings_cli/": (5, 20),
+    "/configuration/v1/ap_cli/": (5, 20),
+    "/configuration/v1/devices/": (5, 30),
+    "/monitoring/v2/aps": (5, 60),
+    "/platform/device_inventory/v1/devices": (5, 60),
+    "/visualrf_api/v1/": (5, 60),
+}
+#
+# Hedged GET requests. Duplicate request is sent when the first one takes
+# longer than C_HEDGE_PERCENTILE of the recent response times of its endpoint
+# class (at least C_HEDGE_MIN_DELAY seconds, after C_HEDGE_MIN_SAMPLES
+# responses of the last C_LATENCY_WINDOW).
+#
+C_HEDGE_PERCENTILE = 95
+C_HEDGE_MIN_DELAY = 0.5
+C_HEDGE_MIN_SAMPLES = 20
+C_LATENCY_WINDOW = 200
+#
+# API endpoint families with their own circuit breaker. Longest prefix wins,
+# "" is the default family.
+#
+C_ENDPOINT_FAMILIES = {
+    "": "other",
+    "/central/": "sites",
+    "/configuration/": "configuration",
+    "/monitoring/": "monitoring",
+    "/platform/": "platform",
+    "/visualrf_api/": "visualrf",
+}
+#
+# Circuit opens when C_BREAKER_ERROR_RATE of the last C_BREAKER_WINDOW
+# requests of the family failed (at least C_BREAKER_MIN_REQUESTS requests).
+# Probe request is sent after C_BREAKER_COOLDOWN seconds.
+#
+C_BREAKER_ERROR_RATE = 0.5
+C_BREAKER_WINDOW = 20
+C_BREAKER_MIN_REQUESTS = 10
+C_BREAKER_COOLDOWN = 60
+#
+# Daily Aruba Central API call budget per tenant counted by all runs in
+# C_DATA_DIR/C_BUDGET_DIR. 0 disables the budget. Counters are written to
+# the file every C_BUDGET_FLUSH_CALLS calls and at the end of the run.
+#
+C_BUDGET_DIR = "budget/"
+C_API_DAILY_BUDGET = 5000
+C_BUDGET_FLUSH_CALLS = 50
@@ -8,6 +8,7 @@
 from docx import Document
 from docx.shared import Cm
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.opc.exceptions import PackageNotFoundError
 from docxcompose.composer import Composer
 from sortedcontainers import SortedList, SortedDict
 import json
@@ -20,18 +21,38 @@ from pycentral.monitoring import Sites
 from pprint import pprint
 from docx2pdf import convert
 from datetime import date, datetime
+from time import sleep
 from pycentral.licensing import Subscriptions
 from pycentral.device_inventory import Inventory
 import glob
 from icecream import ic
-from docxcentral.config import C_TEMPLATE_DOCX, C_DOCX_DIR, C_BOM_DIR
+from docxcentral.config import (
+    C_TEMPLATE_DOCX,
+    C_DOCX_DIR,
+    C_BOM_DIR,
+    C_IMAGES_DIR,
+    C_QUERY_PROFILES,
+    C_STYLE_TITLE,
+    C_STYLE_SUBTITLE,
+    C_STYLE_HEADING,
+    C_STYLE_ROWHEAD,
+    C_STYLE_BODY,
+    C_STYLE_TABLE,
+    C_DOCX_STYLES,
+    C_IMAGE_WIDTH_PHOTO,
+    C_IMAGE_WIDTH_LOCATION,
+)
 from docxcentral.lib.arguments import init_arguments
 from docxcentral.lib.central import (
     connect_to_central,
-    get_central_data,
+    log_central_statistics,
+    get_central_data_all,
+    iter_central_items,
     post_central_data,
+    gather_central_calls,
     get_per_ap_settings,
     get_per_ap_config,
+    get_ap_details,
     get_campus_id,
     get_buildings,
     get_floors,
@@ -43,6 +64,11 @@ from docxcentral.lib.central import (
     get_wlan_list,
     get_sites,
 )
+from docxcentral.lib.devicestore import device_fingerprint
+from docxcentral.lib.template import TemplateCache
+from docxcentral.lib.tables import TableBuilder
+from docxcentral.lib.images import normalize_images
+from docxcentral.lib.assets import AssetIndex
 from docxcentral.logwriter import log_writer
 
 """
@@ -53,6 +79,17 @@ C_BOM_DIR = "bom/"
 
 global params
 
+"""
+Document sections skipped because of open API circuit (deferred) and
+sections with API requests refused by open circuit (degraded)
+"""
+sections = {"deferred": [], "degraded": []}
+
+"""
+AP images and BOM documents, scanned once per run
+"""
+asset_index = AssetIndex(images_dir=C_IMAGES_DIR, bom_dir=C_BOM_DIR)
+
 
 def set_column_width(column, width) -> None:
     for cell in column.cells:
@@ -75,14 +112,19 @@ def sort_ap_dict(ap_list: dict) -> list[list]:
     return sorted(new_ap, key=lambda x: x[1])
 
 
-def add_ap_row(table, label, value, offset=0):
-    row_cells = table.add_row().cells
-    row_cells[0].text = f"{label}:"
-    row_cells[0].paragraphs[0].style = "Table Rowhead 8 pt"
-    row_cells[0].width = Cm(2)
-    row_cells[1].text = f"{value}"
-    row_cells[1].paragraphs[0].style = "Table Body 8pt"
-    return row_cells
+def add_ap_rows(table, rows: list) -> list:
+    """
+    Append (label, value) rows to two column table
+
+    Return: list of cells of the new rows
+    """
+    builder = TableBuilder(
+        table=table,
+        styles=[C_STYLE_ROWHEAD, C_STYLE_BODY],
+        widths=[Cm(2), None],
+        registry=template_cache.styles,
+    )
+    return builder.add_rows([[f"{label}:", f"{value}"] for label, value in rows])
 
 
 def add_picture_to_cell(paragraph, picture, width=None, height=None) -> None:
@@ -112,11 +154,7 @@ def sort_list(data, key) -> list:
 
 def print_ap_details(central, item) -> None:
     ap_data = get_per_ap_settings(central=central, serial_no=item["serial"])
-    ap_config = get_central_data(
-        central=central,
-        apipath=f"/configuration/v1/devices/{item['serial']}/configuration",
-        apiparams={"limit": 0},
-    )
+    ap_config = get_per_ap_config(central=central, serial_no=item["serial"])
     ap_line = [
         item.get("name"),
         item.get("serial"),
@@ -164,7 +202,13 @@ def print_all_ap_details(central, group) -> None:
     }
     apipath = "/monitoring/v2/aps"
 
-    data = get_central_data(central=central, apipath=apipath, apiparams=apiparams)
+    data = get_central_data_all(
+        central=central,
+        apipath=apipath,
+        items_key="aps",
+        apiparams=apiparams,
+        jobs=params["jobs"],
+    )
     if not data.get("aps"):
         log_writer.error("Print_All_AP_Details Failed. No APs returned from Central")
         return None
@@ -175,154 +219,239 @@ def print_all_ap_details(central, group) -> None:
     return None
 
 
-def add_ap_to_page(central, document, item) -> None:
+def ap_location_images(item) -> list:
+    return asset_index.ap_locations(site=item["site"], serial=item["serial"])
+
+
+def ap_photos(item) -> list:
+    return asset_index.ap_photos(site=item["site"], serial=item["serial"])
+
+
+def prepare_ap_images(aps: list) -> dict:
+    """
+    Downsample photos and location images of APs for their print width
+
+    Return: dict {image filename: filename of the image to embed}
+    """
+    widths = {}
+    for item in aps:
+        for picture_file in ap_location_images(item=item):
+            widths[picture_file] = C_IMAGE_WIDTH_LOCATION
+        for picture_file in ap_photos(item=item):
+            widths[picture_file] = C_IMAGE_WIDTH_PHOTO
+    return normalize_images(
+        images=widths,
+        cache_dir=params["images"]["cache_dir"],
+        dpi=params["images"]["dpi"],
+        jobs=params["jobs"],
+    )
+
+
+def add_ap_to_page(central, document, item, details, images={}) -> None:
+    """
+    Add AP page to the site document
+
+    details is the get_ap_details entry for the AP. No API calls are made here.
+    images maps image files to downsampled images from prepare_ap_images.
+    """
     log_writer.info(f"Add AP {item['name']} {item['serial']}")
-    ap_data = get_per_ap_settings(central=central, serial_no=item["serial"])
+    ap_data = details["settings"]
     document.add_paragraph(
-        f'AP: {item["name"]}', style="Aruba body Quote text 2 Orange Arial 16pt"
+        f'AP: {item["name"]}', style=C_STYLE_HEADING
     )
     main_table = document.add_table(rows=1, cols=2)
     hdr_row = main_table.rows[0].cells
     table = hdr_row[0].add_table(rows=1, cols=2)
     table.autofit = True
-    table.style = "Table Grid"
+    table.style = C_STYLE_TABLE
     table.columns[0].width = Cm(3)
     table.cell(0, 0).text = "Parameter"
     table.cell(0, 0).width = Cm(3)
     table.cell(0, 1).text = "Value"
-    row_cells = add_ap_row(table=table, label="Site", value=item["site"])
-    row_cells = add_ap_row(table=table, label="AP Group", value=item["group_name"])
-    row_cells = add_ap_row(table=table, label="AP Model", value=item["model"])
-    row_cells = add_ap_row(table=table, label="Serial No", value=item["serial"])
-    row_cells = add_ap_row(table=table, label="Labels", value=item["labels"])
-    row_cells = add_ap_row(table=table, label="MAC address", value=item["macaddr"])
-    row_cells = add_ap_row(table=table, label="Mesh role", value=item["mesh_role"])
-    row_cells = add_ap_row(
-        table=table, label="IP address", value=item.get("ip_address")
-    )
-    row_cells = add_ap_row(
-        table=table, label="Public IP address", value=item.get("public_ip_address")
-    )
-    row_cells = add_ap_row(
-        table=table, label="Firmware version", value=item.get("firmware_version")
-    )
-    row_cells = add_ap_row(
-        table=table, label="SSID count", value=item.get("ssid_count")
-    )
     try:
         rf_zone = ap_data[11]
-    except IndexError:
+    except (IndexError, KeyError):
         rf_zone = "default default"
-    row_cells = add_ap_row(table=table, label="RF zone", value=rf_zone.split()[1])
+    add_ap_rows(
+        table=table,
+        rows=[
+            ("Site", item["site"]),
+            ("AP Group", item["group_name"]),
+            ("AP Model", item["model"]),
+            ("Serial No", item["serial"]),
+            ("Labels", item["labels"]),
+            ("MAC address", item["macaddr"]),
+            ("Mesh role", item["mesh_role"]),
+            ("IP address", item.get("ip_address")),
+            ("Public IP address", item.get("public_ip_address")),
+            ("Firmware version", item.get("firmware_version")),
+            ("SSID count", item.get("ssid_count")),
+            ("RF zone", rf_zone.split()[1]),
+        ],
+    )
 
     radio_table = hdr_row[1].add_table(rows=1, cols=2)
     radio_table.autofit = False
-    radio_table.style = "Table Grid"
+    radio_table.style = C_STYLE_TABLE
     radio_table.columns[0].width = Cm(2)
     radio_table.cell(0, 0).text = "Radio"
     radio_table.cell(0, 0).width = Cm(2)
     radio_table.cell(0, 1).text = "Parameter"
-    for radios in item["radios"]:
-        row_cells = add_ap_row(
-            table=radio_table, label=f'Radio {radios["index"]}', value=""
-        )
-
+    radio_rows = add_ap_rows(
+        table=radio_table,
+        rows=[(f'Radio {radios["index"]}', "") for radios in item["radios"]],
+    )
+    for radios, row_cells in zip(item["radios"], radio_rows):
         p = row_cells[1].paragraphs[0].clear()
         table_cell = row_cells[1].add_table(rows=0, cols=2)
-        for radio in radios:
-            if radio in [
-                "macaddr",
-                "radio_name",
-                "radio_type",
-                "spatial_stream",
-                "tx_power",
-            ]:
-                table_cells = add_ap_row(
-                    table=table_cell,
-                    label=radio,
-                    value=str(radios.get(radio)),
-                    offset=0,
-                )
+        add_ap_rows(
+            table=table_cell,
+            rows=[
+                (radio, str(radios.get(radio)))
+                for radio in radios
+                if radio
+                in [
+                    "macaddr",
+                    "radio_name",
+                    "radio_type",
+                    "spatial_stream",
+                    "tx_power",
+                ]
+            ],
+        )
 
-    p = document.add_paragraph("Notes: ", style="Table Rowhead 8 pt")
-    p = document.add_paragraph(item.get("notes"), style="Table Body 8pt")
-    p = document.add_paragraph("Location: ", style="Table Rowhead 8 pt")
-    for picture_file in glob.glob(
-        f"images/{item['site']}/{item['serial']}-*_location.png"
-    ):
+    p = document.add_paragraph("Notes: ", style=C_STYLE_ROWHEAD)
+    p = document.add_paragraph(item.get("notes"), style=C_STYLE_BODY)
+    p = document.add_paragraph("Location: ", style=C_STYLE_ROWHEAD)
+    for picture_file in ap_location_images(item=item):
         p = document.add_paragraph(" ")
         p.alignment = WD_ALIGN_PARAGRAPH.CENTER
         r = p.add_run()
-        r.add_picture(picture_file, width=Cm(13))
+        r.add_picture(
+            images.get(picture_file, picture_file), width=Cm(C_IMAGE_WIDTH_LOCATION)
+        )
 
-    p = document.add_paragraph(" ", style="Table Rowhead 8 pt")
+    p = document.add_paragraph(" ", style=C_STYLE_ROWHEAD)
 
     idx = 4
-    for picture_file in sort_ap_list(f"images/{item['site']}/{item['serial']}*.jpg"):
+    for picture_file in ap_photos(item=item):
         if idx > 2:
             p = document.add_paragraph("\n")
             r = p.add_run()
             idx = 1
-        r.add_picture(picture_file, width=Cm(7.5))
+        r.add_picture(
+            images.get(picture_file, picture_file), width=Cm(C_IMAGE_WIDTH_PHOTO)
+        )
         r.add_text(" ")
         idx += 1
 
-    ap_config = get_central_data(
-        central=central,
-        apipath=f"/configuration/v1/devices/{item['serial']}/configuration",
-        apiparams={"limit": 0},
-    )
+    ap_config = details["configuration"]
+    if not isinstance(ap_config, str):
+        ap_config = "Configuration not available"
 
     p = document.add_page_break()
     p = document.add_paragraph()
     p.add_run("Configuration")
-    p.style = "Table Rowhead 8 pt"
+    p.style = C_STYLE_ROWHEAD
     p = document.add_paragraph()
     p.add_run(ap_config).font.name = "Consolas"
-    p.style = "Table Body 8pt"
+    p.style = C_STYLE_BODY
 
     return None
 
 
 def add_document_header(document, item) -> None:
-    document.add_paragraph(item, style="Aruba Cover: Main title Orange Arial Bold 36pt")
+    document.add_paragraph(item, style=C_STYLE_TITLE)
     document.add_paragraph(
         f"\n\n{params['customer']['customer_name']}\n\n{params['customer']['document_title']} {date.today()}\n\n\n\n",
-        style="Aruba Cover: Subheading CAPS Dark Blue Arial 20pt",
+        style=C_STYLE_SUBTITLE,
     )
 
     return None
 
 
+"""
+Template is parsed once per process. Documents are copies of the template
+with the cover page of add_document_header already rendered.
+"""
+template_cache = TemplateCache(
+    filename=C_TEMPLATE_DOCX, render_cover=add_document_header
+)
+
+
+def new_document(title: str):
+    """
+    Return new document from template with cover page for title
+    """
+    return template_cache.document(title=title)
+
+
+def preflight_template() -> bool:
+    """
+    Check that template can be loaded and has all styles in C_DOCX_STYLES
+
+    Return: False when documents can not be created
+    """
+    try:
+        missing = template_cache.styles.missing(C_DOCX_STYLES)
+    except PackageNotFoundError as err:
+        log_writer.error(f"Template {C_TEMPLATE_DOCX} can not be loaded: {err}")
+        return False
+    if missing:
+        log_writer.error(f"Styles not found in template {C_TEMPLATE_DOCX}: {missing}")
+        return False
+    return True
+
+
 def add_site_document(central, item, ap_list, data) -> None:
-    document = Document(C_TEMPLATE_DOCX)
-    add_document_header(document=document, item=item["site_name"])
+    log_writer.info(f'Prefetch AP data for site {item["site_name"]}')
+    site_aps = [data["aps"][ap] for ap in ap_list[item["site_name"]]]
+    ap_details = get_ap_details(
+        central=central,
+        serial_list=[ap["serial"] for ap in site_aps],
+        jobs=params["jobs"],
+        fingerprints={ap["serial"]: device_fingerprint(ap) for ap in site_aps},
+        groups=(
+            {ap["serial"]: ap.get("group_name") for ap in site_aps}
+            if params["group_config"]
+            else {}
+        ),
+    )
+
+    document = new_document(title=item["site_name"])
     document.add_paragraph(
         f'Site: {item["site_name"]}',
-        style="Aruba body Quote text 2 Orange Arial 16pt",
+        style=C_STYLE_HEADING,
     )
     table = document.add_table(rows=1, cols=2)
     table.autofit = True
-    table.style = "Table Grid"
+    table.style = C_STYLE_TABLE
     table.columns[0].width = Cm(3)
     table.cell(0, 0).width = Cm(3)
-    row_cells = add_ap_row(
+    add_ap_rows(
         table=table,
-        label="Number of devices",
-        value=str(item["associated_device_count"]),
+        rows=[
+            ("Number of devices", str(item["associated_device_count"])),
+            ("Address", item.get("address")),
+            ("Post Code", item.get("zipcode")),
+            ("City", item.get("city")),
+            ("Country", item.get("country")),
+            ("Longitude", item.get("longitude")),
+            ("Latitude", item.get("latitude")),
+        ]
+        + [("AP", data["aps"][ap]["name"]) for ap in ap_list[item["site_name"]]],
     )
-    row_cells = add_ap_row(table=table, label="Address", value=item.get("address"))
-    row_cells = add_ap_row(table=table, label="Post Code", value=item.get("zipcode"))
-    row_cells = add_ap_row(table=table, label="City", value=item.get("city"))
-    row_cells = add_ap_row(table=table, label="Country", value=item.get("country"))
-    row_cells = add_ap_row(table=table, label="Longitude", value=item.get("longitude"))
-    row_cells = add_ap_row(table=table, label="Latitude", value=item.get("latitude"))
-    for ap in ap_list[item["site_name"]]:
-        row_cells = add_ap_row(table=table, label="AP", value=data["aps"][ap]["name"])
 
+    images = prepare_ap_images(aps=site_aps)
     document.add_page_break()
     for ap in ap_list[item["site_name"]]:
-        add_ap_to_page(central=central, document=document, item=data["aps"][ap])
+        add_ap_to_page(
+            central=central,
+            document=document,
+            item=data["aps"][ap],
+            details=ap_details[data["aps"][ap]["serial"]],
+            images=images,
+        )
         document.add_page_break()
 
     doc_filename = f"{item['site_name']}.docx"
@@ -340,29 +469,32 @@ def add_site_document(central, item, ap_list, data) -> None:
     return None
 
 
-def add_rf_group_to_page(central, group_name) -> None:
+def add_rf_group_to_page(central, group_name, data=None) -> None:
     """
     Create document with all RF group data for AP Group
 
+    data is result of get_rf_groups when already fetched.
     """
-    document = Document(C_TEMPLATE_DOCX)
-    data = get_rf_groups(central=central, group_name=group_name)
-    add_document_header(document=document, item=f"Configuration group\n{group_name}")
+    if data is None:
+        data = get_rf_groups(central=central, group_name=group_name)
+    document = new_document(title=f"Configuration group\n{group_name}")
     document.add_page_break()
     for groups in data:
         document.add_paragraph(
             f"RF Group: {group_name}",
-            style="Aruba body Quote text 2 Orange Arial 16pt",
+            style=C_STYLE_HEADING,
         )
         table = document.add_table(rows=1, cols=2)
         table.autofit = True
-        table.style = "Table Grid"
+        table.style = C_STYLE_TABLE
 
+        rows = []
         for group in groups:
             try:
-                row_cells = add_ap_row(table=table, label=group, value=groups[group])
+                rows.append((group, groups[group]))
             except TypeError:
                 pass
+        add_ap_rows(table=table, rows=rows)
 
         document.add_page_break()
 
@@ -372,34 +504,37 @@ def add_rf_group_to_page(central, group_name) -> None:
     return None
 
 
-def add_wlan_group_to_page(central, group_name) -> None:
+def add_wlan_group_to_page(central, group_name, data=None) -> None:
     """
     Create document with all RF group data for AP Group
 
+    data is result of get_wlan_list when already fetched.
     """
 
-    document = Document(C_TEMPLATE_DOCX)
-    data = get_wlan_list(central=central, group_name=group_name)
+    if data is None:
+        data = get_wlan_list(central=central, group_name=group_name)
     if type(data) is not dict:
         log_writer.error(f"No data returned for WLANs on group {group_name}")
         return None
 
-    add_document_header(document=document, item=f"Configuration group\n{group_name}")
+    document = new_document(title=f"Configuration group\n{group_name}")
     document.add_page_break()
 
     for groups in data.get("wlans"):
         document.add_paragraph(
             f"WLAN: {groups['name']}",
-            style="Aruba body Quote text 2 Orange Arial 16pt",
+            style=C_STYLE_HEADING,
         )
         table = document.add_table(rows=1, cols=2)
         table.autofit = True
-        table.style = "Table Grid"
+        table.style = C_STYLE_TABLE
 
+        rows = []
         for group in groups:
             tmp_value = groups[group]
             value = tmp_value if not isinstance(tmp_value, dict) else tmp_value["value"]
-            row_cells = add_ap_row(table=table, label=group, value=value)
+            rows.append((group, value))
+        add_ap_rows(table=table, rows=rows)
         document.add_page_break()
     doc_filename = f"{C_DOCX_DIR}{group_name}_wlan_groups.docx"
     document.save(doc_filename)
@@ -412,7 +547,7 @@ def add_bom_list(document, doc_filename, site_name) -> None:
     """Add additional document to the master document file"""
     comp = Composer(document)
 
-    bom_files = glob.glob(f"{C_BOM_DIR}{site_name}*.docx")
+    bom_files = asset_index.bom_files(site_name=site_name)
 
     for filename in bom_files:
         log_writer.info(f"BOM FILENAME : {doc_filename} {filename}")
@@ -449,59 +584,49 @@ def add_subscription_keys(central) -> None:
         return None
 
     data = data_msg.get("subscriptions")
-    document = Document(C_TEMPLATE_DOCX)
-    add_document_header(document=document, item=f"Subscriptions")
+    document = new_document(title=f"Subscriptions")
     document.add_page_break()
 
     document.add_paragraph(
         f"Subscriptions",
-        style="Aruba body Quote text 2 Orange Arial 16pt",
+        style=C_STYLE_HEADING,
     )
-    table = document.add_table(rows=1, cols=8)
+    table = document.add_table(rows=0, cols=8)
     table.autofit = True
-    table.style = "Table Grid"
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = "SKU"
-    hdr_cells[0].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[1].text = "License Type"
-    hdr_cells[1].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[2].text = "Quantity"
-    hdr_cells[2].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[3].text = "Available"
-    hdr_cells[3].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[4].text = "Active"
-    hdr_cells[4].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[5].text = "Subscription Key"
-    hdr_cells[5].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[6].text = "Start Date"
-    hdr_cells[6].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[7].text = "End Date"
-    hdr_cells[7].paragraphs[0].style = "Table Rowhead 8 pt"
+    table.style = C_STYLE_TABLE
+    TableBuilder(
+        table=table, styles=[C_STYLE_ROWHEAD] * 8, registry=template_cache.styles
+    ).add_row(
+        [
+            "SKU",
+            "License Type",
+            "Quantity",
+            "Available",
+            "Active",
+            "Subscription Key",
+            "Start Date",
+            "End Date",
+        ]
+    )
 
+    builder = TableBuilder(
+        table=table, styles=[C_STYLE_BODY] * 8, registry=template_cache.styles
+    )
     for subscription in data:
         if "EVAL" in subscription.get("sku"):
             continue
-        row_cells = table.add_row().cells
-        row_cells[0].text = subscription.get("sku")
-        row_cells[0].paragraphs[0].style = "Table Body 8pt"
-        row_cells[1].text = subscription.get("license_type")
-        row_cells[1].paragraphs[0].style = "Table Body 8pt"
-        row_cells[2].text = f'{subscription.get("quantity")}'
-        row_cells[2].paragraphs[0].style = "Table Body 8pt"
-        row_cells[3].text = f'{subscription.get("available")}'
-        row_cells[3].paragraphs[0].style = "Table Body 8pt"
-        row_cells[4].text = f'{subscription.get("active")}'
-        row_cells[4].paragraphs[0].style = "Table Body 8pt"
-        row_cells[5].text = f'{subscription.get("subscription_key")}'
-        row_cells[5].paragraphs[0].style = "Table Body 8pt"
-        row_cells[6].text = (
-            f'{datetime.fromtimestamp(int(subscription.get("start_date")) / 1000).strftime("%d.%m.%Y")}'
+        builder.add_row(
+            [
+                subscription.get("sku"),
+                subscription.get("license_type"),
+                f'{subscription.get("quantity")}',
+                f'{subscription.get("available")}',
+                f'{subscription.get("active")}',
+                f'{subscription.get("subscription_key")}',
+                f'{datetime.fromtimestamp(int(subscription.get("start_date")) / 1000).strftime("%d.%m.%Y")}',
+                f'{datetime.fromtimestamp(int(subscription.get("end_date")) / 1000  ).strftime("%d.%m.%Y")}',
+            ]
         )
-        row_cells[6].paragraphs[0].style = "Table Body 8pt"
-        row_cells[7].text = (
-            f'{datetime.fromtimestamp(int(subscription.get("end_date")) / 1000  ).strftime("%d.%m.%Y")}'
-        )
-        row_cells[7].paragraphs[0].style = "Table Body 8pt"
 
     doc_filename = f"{C_DOCX_DIR}subscriptions.docx"
     try:
@@ -512,15 +637,45 @@ def add_subscription_keys(central) -> None:
     return None
 
 
+def add_ap_identity(central, ap_list: dict, serials: list) -> None:
+    """
+    Set name and site of APs in ap_list from the index query profile
+    """
+    data = get_site_aps(central=central, profile="index")
+    if not isinstance(data, dict) or not data.get("aps"):
+        log_writer.warning(f"AP names for device inventory not available {data}")
+        return None
+    serials = set(serials)
+    for ap in data["aps"]:
+        if ap.get("serial") in serials:
+            ap_list[ap["serial"]]["name"] = ap.get("name", "")
+            ap_list[ap["serial"]]["site"] = ap.get("site", "")
+    return None
+
+
 def add_device_inventory(central, ap_list: dict) -> None:
-    inve = Inventory()
-    msg = inve.get_inventory(central, limit=120)["msg"]
-    data = msg["devices"]
-    total = msg["total"]
+    if params["stream_json"]:
+        meta = {}
+        data = iter_central_items(
+            central=central,
+            apipath="/platform/device_inventory/v1/devices",
+            items_key="devices",
+            apiparams={"sku_type": "all"},
+            limit=120,
+            all_pages=False,
+            meta=meta,
+        )
+    else:
+        inve = Inventory()
+        msg = inve.get_inventory(central, limit=120)["msg"]
+        data = msg["devices"]
+        total = msg["total"]
+    unknown = []
     for ap in data:
         sn = ap["serial"]
         if sn not in ap_list:
             ap_list[sn] = {"name": "", "site": ""}
+            unknown.append(sn)
         ap_list[sn]["aruba_part_no"] = ap.get("aruba_part_no")
         ap_list[sn]["device_type"] = ap.get("device_type")
         ap_list[sn]["macaddr"] = ap.get("macaddr")
@@ -528,75 +683,66 @@ def add_device_inventory(central, ap_list: dict) -> None:
         ap_list[sn]["serial"] = ap.get("serial")
         ap_list[sn]["subscription_key"] = ap.get("subscription_key")
         ap_list[sn]["tier_type"] = ap.get("tier_type")
+    if params["stream_json"]:
+        total = meta.get("total")
+    # APs of sites that were not documented
+    if unknown and (params.get("site_list") or sections["degraded"]):
+        add_ap_identity(central=central, ap_list=ap_list, serials=unknown)
 
-    document = Document(C_TEMPLATE_DOCX)
-    add_document_header(document=document, item=f"Device Inventory")
+    document = new_document(title=f"Device Inventory")
     document.add_page_break()
 
     document.add_paragraph(
         f"Subscriptions",
-        style="Aruba body Quote text 2 Orange Arial 16pt",
+        style=C_STYLE_HEADING,
     )
     document.add_paragraph(
         f"Total devices: {total}",
-        style="Aruba body Quote text 2 Orange Arial 16pt",
+        style=C_STYLE_HEADING,
     )
 
-    table = document.add_table(rows=1, cols=7)
+    table = document.add_table(rows=0, cols=7)
     table.autofit = True
-    table.style = "Table Grid"
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = "Part No"
-    hdr_cells[0].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[1].text = "Device type"
-    hdr_cells[1].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[2].text = "MAC Address"
-    hdr_cells[2].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[3].text = "Model"
-    hdr_cells[3].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[4].text = "Serial"
-    hdr_cells[4].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[5].text = "Subscription Key"
-    hdr_cells[5].paragraphs[0].style = "Table Rowhead 8 pt"
-    hdr_cells[6].text = "Tier"
-    hdr_cells[6].paragraphs[0].style = "Table Rowhead 8 pt"
+    table.style = C_STYLE_TABLE
+    TableBuilder(
+        table=table, styles=[C_STYLE_ROWHEAD] * 7, registry=template_cache.styles
+    ).add_row(
+        [
+            "Part No",
+            "Device type",
+            "MAC Address",
+            "Model",
+            "Serial",
+            "Subscription Key",
+            "Tier",
+        ]
+    )
 
+    name_row = TableBuilder(
+        table=table,
+        styles=[C_STYLE_BODY] * 2,
+        spans=[4, 3],
+        registry=template_cache.styles,
+    )
+    device_row = TableBuilder(
+        table=table, styles=[C_STYLE_BODY] * 7, registry=template_cache.styles
+    )
     for key, value in sort_ap_dict(ap_list):
-        #    for subscription in data:
         subscription = ap_list[key]
-        row_cells = table.add_row().cells
-        row = table.rows[-1]
-        a, b, d, c = row.cells[0:4]
-        c = a.merge(c)
-        try:
-            c.text = f'\n{subscription.get("name")}'
-        except KeyError:
-            c.text = "\n"
-        c.paragraphs[0].style = "Table Body 8pt"
-
-        a, b, d = row.cells[4:7]
-        c = a.merge(d)
-        try:
-            c.text = f'\n{subscription.get("site")}'
-        except KeyError:
-            c.text = "\n"
-        c.paragraphs[0].style = "Table Body 8pt"
-
-        row_cells = table.add_row().cells
-        row_cells[0].text = subscription.get("aruba_part_no")
-        row_cells[0].paragraphs[0].style = "Table Body 8pt"
-        row_cells[1].text = subscription.get("device_type")
-        row_cells[1].paragraphs[0].style = "Table Body 8pt"
-        row_cells[2].text = f'{subscription.get("macaddr")}'
-        row_cells[2].paragraphs[0].style = "Table Body 8pt"
-        row_cells[3].text = f'{subscription.get("model")}'
-        row_cells[3].paragraphs[0].style = "Table Body 8pt"
-        row_cells[4].text = f'{subscription.get("serial")}'
-        row_cells[4].paragraphs[0].style = "Table Body 8pt"
-        row_cells[5].text = f'{subscription.get("subscription_key")}'
-        row_cells[5].paragraphs[0].style = "Table Body 8pt"
-        row_cells[6].text = f'{subscription.get("tier_type")}'
-        row_cells[6].paragraphs[0].style = "Table Body 8pt"
+        name_row.add_row(
+            [f'\n{subscription.get("name")}', f'\n{subscription.get("site")}']
+        )
+        device_row.add_row(
+            [
+                subscription.get("aruba_part_no"),
+                subscription.get("device_type"),
+                f'{subscription.get("macaddr")}',
+                f'{subscription.get("model")}',
+                f'{subscription.get("serial")}',
+                f'{subscription.get("subscription_key")}',
+                f'{subscription.get("tier_type")}',
+            ]
+        )
 
     doc_filename = f"{C_DOCX_DIR}device_inventory.docx"
     document.save(doc_filename)
@@ -604,22 +750,54 @@ def add_device_inventory(central, ap_list: dict) -> None:
     return None
 
 
-def add_sites_to_page(central, site_name, sites) -> dict:
+def get_site_aps(central, site_name=None, profile="full") -> dict:
+    """
+    Return all APs for site from /monitoring/v2/aps.
+    site_name None returns APs for all sites.
+    AP records contain only fields of the query profile in C_QUERY_PROFILES.
+    """
     apiparams = {
         #        "group": group_name,
         "site": site_name,
         "offset": 0,
-        "calculate_totals": "true",
-        "calculate_client_count": "true",
-        "calculate_ssid_count": "true",
-        "show_resource_details": "true",
-    }
+    } | C_QUERY_PROFILES[profile]["params"]
+    if site_name is None:
+        apiparams.pop("site")
     apipath = "/monitoring/v2/aps"
 
-    data = get_central_data(central=central, apipath=apipath, apiparams=apiparams)
+    if params["stream_json"]:
+        meta = {}
+        aps = list(
+            iter_central_items(
+                central=central,
+                apipath=apipath,
+                items_key="aps",
+                apiparams=apiparams,
+                fields=C_QUERY_PROFILES[profile]["fields"],
+                meta=meta,
+            )
+        )
+        return meta | {"aps": aps, "count": len(aps)}
+
+    return get_central_data_all(
+        central=central,
+        apipath=apipath,
+        items_key="aps",
+        apiparams=apiparams,
+        jobs=params["jobs"],
+        fields=C_QUERY_PROFILES[profile]["fields"],
+    )
+
 
+def index_aps_by_site(data) -> tuple[dict, dict]:
     """
-        Pripravi seznam APjev sortiran po imenu in doda APje na Site.
+    Pripravi seznam APjev sortiran po imenu.
+
+    Return: (ap_list, ap_list_by_sn)
+
+        ap_list: {"<site name>": [<index in data["aps"]>, ...]}
+
+        ap_list_by_sn: {"<serial>": {"name": "", "site": "", "group": ""}}
     """
     ap_list = {}
     ap_list_by_sn = {}
@@ -635,6 +813,24 @@ def add_sites_to_page(central, site_name, sites) -> dict:
         else:
             ap_list[item["site"]].append(idx)
 
+    return ap_list, ap_list_by_sn
+
+
+def add_sites_to_page(central, site_name, sites, data=None) -> dict:
+    """
+    Create site documents for APs in data.
+
+    data is the /monitoring/v2/aps result. When None, APs for site_name are
+    fetched from Central.
+    """
+    if data is None:
+        data = get_site_aps(central=central, site_name=site_name)
+
+    """
+        Pripravi seznam APjev sortiran po imenu in doda APje na Site.
+    """
+    ap_list, ap_list_by_sn = index_aps_by_site(data=data)
+
     """ Sites data """
 
     for name, idx in sort_list(data=sites, key="site_name"):
@@ -646,6 +842,108 @@ def add_sites_to_page(central, site_name, sites) -> dict:
     return ap_list_by_sn
 
 
+def run_section(section: str, families: list, func, **kwargs) -> any:
+    """
+    Run document section func(**kwargs) that depends on API families.
+    kwargs must contain central.
+
+    Section is deferred when circuit of any of the families is open, and is
+    reported as degraded when API requests were refused or failed after all
+    retries while it was running.
+
+    Return: func result or None when deferred
+    """
+    central = kwargs["central"]
+    breakers = central.circuit_breakers.breakers
+    open_families = [family for family in families if breakers[family].is_open()]
+    if open_families:
+        log_writer.warning(
+            f"Section {section} deferred, {open_families} API circuit open"
+        )
+        sections["deferred"].append((section, families, func, kwargs))
+        return None
+    refused = central.circuit_breakers.refused(families)
+    failed = central.circuit_breakers.failed(families)
+    if central.call_budget is not None:
+        central.call_budget.phase = section
+    try:
+        result = func(**kwargs)
+    finally:
+        if central.call_budget is not None:
+            central.call_budget.phase = "setup"
+    refused = central.circuit_breakers.refused(families) - refused
+    failed = central.circuit_breakers.failed(families) - failed
+    if refused or failed:
+        log_writer.warning(
+            f"Section {section} degraded, API requests refused {refused}, failed {failed}"
+        )
+        sections["degraded"].append(section)
+    return result
+
+
+def run_deferred_sections(central) -> list:
+    """
+    Run deferred sections once their circuits allow a probe request.
+    Sections still blocked are reported as degraded without waiting again.
+
+    Return: list of results of sections that were run
+    """
+    deferred = sections["deferred"]
+    sections["deferred"] = []
+    breakers = central.circuit_breakers.breakers
+    failed = set()
+    results = []
+    for section, families, func, kwargs in deferred:
+        if failed.intersection(families):
+            sections["degraded"].append(section)
+            continue
+        wait = max(breakers[family].probe_in() for family in families)
+        if wait > 0:
+            log_writer.info(f"Waiting {wait:.0f}s to retry section {section}")
+            sleep(wait)
+        result = run_section(section, families, func, **kwargs)
+        if sections["deferred"] and sections["deferred"][-1][0] == section:
+            sections["deferred"].pop()
+            sections["degraded"].append(section)
+            failed.update(f for f in families if breakers[f].is_open())
+            continue
+        failed.update(f for f in families if breakers[f].is_open())
+        results.append(result)
+    return results
+
+
+def add_groups_to_page(central, all_groups) -> None:
+    group_calls = []
+    for group in all_groups:
+        group_calls.append((get_rf_groups, {"central": central, "group_name": group}))
+        group_calls.append((get_wlan_list, {"central": central, "group_name": group}))
+    group_data = gather_central_calls(calls=group_calls, jobs=params["jobs"])
+
+    for idx, group in enumerate(all_groups):
+        log_writer.info(
+            f"Working on group {group} ------------------------------------------------"
+        )
+        add_rf_group_to_page(
+            central=central, group_name=group, data=group_data[2 * idx]
+        )
+        add_wlan_group_to_page(
+            central=central, group_name=group, data=group_data[2 * idx + 1]
+        )
+
+    return None
+
+
+def add_fleet_to_page(central, sites) -> dict:
+    data = get_site_aps(central=central)
+    if not isinstance(data, dict) or data.get("aps") is None:
+        log_writer.error(f"No APs returned from Central {data}")
+        data = {"aps": []}
+    site_names = [site["site_name"] for site in sites]
+    data["aps"] = [ap for ap in data["aps"] if ap.get("site") in site_names]
+    log_writer.info(f"Fetched {len(data['aps'])} APs for all sites")
+    return add_sites_to_page(central=central, site_name=None, sites=sites, data=data)
+
+
 """
 Podatki o posamezni lokaciji (site)
 
@@ -665,12 +963,43 @@ Podatki o posamezni lokaciji (site)
 def run_docx():
     global params
     params = init_arguments()
-    central = connect_to_central(central_info=params.get("central_info"))
+    if not preflight_template():
+        return None
+    asset_index.scan()
+    log_writer.info(f"Asset index: {asset_index.statistics()}")
+    central = connect_to_central(
+        central_info=params.get("central_info"),
+        options=params.get("central_options"),
+    )
+    if central.call_budget is not None and not central.call_budget.check_run():
+        log_writer.error("Run refused. Not enough API calls left for today.")
+        return None
 
-    #   save_floorplans(central=central, central_info=params.get("central_info"))
+    completed = False
+    try:
+        write_documents(central=central)
+        completed = True
+    finally:
+        # calls of an aborted run are counted, but not used as estimate
+        if central.call_budget is not None:
+            central.call_budget.flush(last_run=completed)
+    log_central_statistics(central=central)
+    return None
+
+
+def write_documents(central) -> None:
+    """
+    Write all documents of the run
+    """
+    #   save_floorplans(
+    #       central=central,
+    #       central_info=params.get("central_info"),
+    #       jobs=params["jobs"],
+    #   )
 
     site_list: list = params.get("site_list")
     all_sites = get_sites(central=central)
+    asset_index.assign_bom(site_names=[site["site_name"] for site in all_sites])
     if len(site_list) > 0:
         sites = [site for site in all_sites if site["site_name"] in site_list]
     else:
@@ -681,27 +1010,64 @@ def run_docx():
         all_groups = get_central_groups(central=central)
 
     log_writer.info(f"Write documentation for following group(s): {all_groups}")
-    add_subscription_keys(central=central)
+    run_section("subscriptions", ["platform"], add_subscription_keys, central=central)
 
     ap_list = {}
 
-    for group in all_groups:
-        log_writer.info(
-            f"Working on group {group} ------------------------------------------------"
-        )
-        add_rf_group_to_page(central=central, group_name=group)
-        add_wlan_group_to_page(central=central, group_name=group)
+    run_section(
+        "groups",
+        ["configuration"],
+        add_groups_to_page,
+        central=central,
+        all_groups=all_groups,
+    )
 
     log_writer.info(f"Write documentation for following site(s): {sites}")
-    for site in sites:
-        ap_list = ap_list | add_sites_to_page(
-            central=central, site_name=site["site_name"], sites=sites
-        )
-        log_writer.info(
-            f"Adding APs to list site {site['site_name']} ap list size {len(ap_list)}"
+    if params["fleet_fetch"]:
+        ap_list = (
+            run_section(
+                "sites",
+                ["monitoring", "configuration"],
+                add_fleet_to_page,
+                central=central,
+                sites=sites,
+            )
+            or {}
         )
+    else:
+        for site in sites:
+            ap_list = ap_list | (
+                run_section(
+                    f"site {site['site_name']}",
+                    ["monitoring", "configuration"],
+                    add_sites_to_page,
+                    central=central,
+                    site_name=site["site_name"],
+                    sites=sites,
+                )
+                or {}
+            )
+            log_writer.info(
+                f"Adding APs to list site {site['site_name']} ap list size {len(ap_list)}"
+            )
+
+    for result in run_deferred_sections(central=central):
+        if isinstance(result, dict):
+            ap_list = ap_list | result
+
+    run_section(
+        "device inventory",
+        ["platform"],
+        add_device_inventory,
+        central=central,
+        ap_list=ap_list,
+    )
+    run_deferred_sections(central=central)
 
-    add_device_inventory(central=central, ap_list=ap_list)
+    if sections["degraded"]:
+        log_writer.warning(f"Degraded sections: {sections['degraded']}")
+    else:
+        log_writer.info("Degraded sections: none")
     return None
 
 
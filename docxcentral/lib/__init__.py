@@ -8,16 +8,30 @@
 
 from .central import (
     connect_to_central,
+    log_central_statistics,
     get_central_data,
     post_central_data,
+    get_central_data_pages,
+    project_fields,
+    iter_central_items,
+    get_central_data_all,
+    get_central_data_async,
+    post_central_data_async,
+    run_central_call,
+    gather_central_calls,
     get_per_ap_settings,
     get_per_ap_config,
+    get_ap_details,
+    get_group_ap_cli,
+    assemble_ap_config,
     get_campus_id,
     get_buildings,
     get_floors,
     get_floor_data,
     get_floor_image,
+    save_floor_image,
     save_floorplans,
+    crawl_floorplans,
     get_rf_groups,
     get_central_groups,
     get_wlan_list,
@@ -29,7 +43,24 @@ from .utilities import (
     get_debug_commands_from_json,
     get_filter_from_json,
     check_path,
+    file_lock,
+    file_sha256,
+    save_base64_stream,
     create_filename,
     select_keys,
 )
 from .arguments import init_arguments
+from .client import CentralClient
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy
+from .cache import ResponseCache
+from .fixtures import FixtureRecorder
+from .latency import LatencyTracker
+from .breaker import CircuitBreaker, CircuitBreakers
+from .budget import CallBudget
+from .template import TemplateCache, copy_document
+from .tables import TableBuilder
+from .styles import StyleRegistry
+from .images import normalize_image, normalize_images
+from .assets import AssetIndex
+from .devicestore import DeviceStore, device_fingerprint
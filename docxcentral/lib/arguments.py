@@ -6,6 +6,7 @@
     
 """
 import argparse
+import os
 import sys
 from datetime import datetime
 from dateutil import parser
@@ -21,6 +22,20 @@ from docxcentral import (
     C_JSON_CENTRAL,
     C_JSON_FILTER,
     C_REQUIRED_KEYS,
+    C_JOBS,
+    C_RATE_LIMIT_SECOND,
+    C_POOL_SIZE,
+    C_GET_RETRY_COUNT,
+    C_RETRY_BACKOFF,
+    C_RETRY_BUDGET,
+    C_CACHE_DIR,
+    C_FIXTURES_DIR,
+    C_DEVICES_DIR,
+    C_BUDGET_DIR,
+    C_API_DAILY_BUDGET,
+    C_CACHE_MAX_SIZE,
+    C_IMAGE_CACHE_DIR,
+    C_IMAGE_DPI,
 )
 
 from . import (
@@ -116,6 +131,132 @@ def define_arguments():
         default=False,
         action="store_true",
     )
+    parser.add_argument(
+        "--jobs",
+        required=False,
+        help=f"Number of concurrent Aruba Central API requests (optional, default={C_JOBS})",
+        default=C_JOBS,
+        type=int,
+    )
+    parser.add_argument(
+        "--fleet_fetch",
+        required=False,
+        help="Fetch all APs with one paginated query and split them by site locally (optional)",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--group_config",
+        required=False,
+        help="Assemble AP configuration from group AP CLI and per AP settings instead of fetching it for every AP (optional)",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--stream_json",
+        required=False,
+        help="Stream and decode AP and inventory lists record by record (optional)",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--image_dpi",
+        required=False,
+        help=f"Downsample AP photos and location images to DPI for print width, 0 embeds originals (optional, default={C_IMAGE_DPI})",
+        default=C_IMAGE_DPI,
+        type=int,
+    )
+    parser.add_argument(
+        "--rate_limit",
+        required=False,
+        help=f"Initial Aruba Central API calls per second (optional, default={C_RATE_LIMIT_SECOND})",
+        default=C_RATE_LIMIT_SECOND,
+        type=float,
+    )
+    parser.add_argument(
+        "--pool_size",
+        required=False,
+        help=f"Keep-alive connections to Aruba Central (optional, default={C_POOL_SIZE})",
+        default=C_POOL_SIZE,
+        type=int,
+    )
+    parser.add_argument(
+        "--retry_count",
+        required=False,
+        help=f"Maximum retries for one API request (optional, default={C_GET_RETRY_COUNT})",
+        default=C_GET_RETRY_COUNT,
+        type=int,
+    )
+    parser.add_argument(
+        "--retry_backoff",
+        required=False,
+        help=f"Base retry backoff in seconds (optional, default={C_RETRY_BACKOFF})",
+        default=C_RETRY_BACKOFF,
+        type=float,
+    )
+    parser.add_argument(
+        "--retry_budget",
+        required=False,
+        help=f"Maximum retries for all API requests in one run (optional, default={C_RETRY_BUDGET})",
+        default=C_RETRY_BUDGET,
+        type=int,
+    )
+    parser.add_argument(
+        "--refresh",
+        required=False,
+        help="Ignore cached API responses. Without value refresh all, otherwise only listed API path prefixes (optional)",
+        default=None,
+        nargs="*",
+    )
+    parser.add_argument(
+        "--no_cache",
+        required=False,
+        help="Do not use response cache (optional)",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--incremental",
+        required=False,
+        help="Refetch AP settings and configuration only for APs changed since the last run (optional)",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--hedge",
+        required=False,
+        help="Send duplicate GET request when a request is slower than 95%% of recent ones (optional)",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--record",
+        required=False,
+        help=f"Record all API responses into {C_FIXTURES_DIR} in data directory for replay. Disables response cache (optional)",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--api_budget",
+        required=False,
+        help=f"Daily Aruba Central API call budget, 0 for no budget (optional, default={C_API_DAILY_BUDGET})",
+        default=C_API_DAILY_BUDGET,
+        type=int,
+    )
+    parser.add_argument(
+        "--budget_mode",
+        required=False,
+        help="When API call budget is exceeded: warn, refuse requests or defer the run to the next day (optional, default=warn)",
+        default="warn",
+        choices=["warn", "refuse", "defer"],
+    )
+    parser.add_argument(
+        "--cache_max_size",
+        required=False,
+        help=f"Maximum response cache size in MB (optional, default={C_CACHE_MAX_SIZE // 1048576})",
+        default=C_CACHE_MAX_SIZE // 1048576,
+        type=int,
+    )
 
     return parser
 
@@ -161,6 +302,49 @@ def process_arguments(args):
     param_dict["condition"] = {"inverse_search": args.inverse_search}
     log_writer.info(f"__Search conditions: {param_dict.get('condition')}")
 
+    param_dict["jobs"] = max(1, args.jobs)
+    log_writer.info(f'__Concurrent API requests: {param_dict["jobs"]}')
+
+    param_dict["fleet_fetch"] = args.fleet_fetch
+    log_writer.info(f'__Fleet wide AP fetch: {param_dict["fleet_fetch"]}')
+
+    param_dict["group_config"] = args.group_config
+    log_writer.info(f'__AP configuration from group CLI: {param_dict["group_config"]}')
+
+    param_dict["stream_json"] = args.stream_json
+    log_writer.info(f'__Streamed JSON decoding: {param_dict["stream_json"]}')
+
+    param_dict["images"] = {
+        "dpi": max(0, args.image_dpi),
+        "cache_dir": os.path.join(args.data_directory, C_IMAGE_CACHE_DIR),
+    }
+    log_writer.info(f'__Image normalization: {param_dict["images"]}')
+
+    param_dict["central_options"] = {
+        "rate_limit": args.rate_limit,
+        "pool_size": max(args.pool_size, args.jobs),
+        "retry_count": args.retry_count,
+        "retry_backoff": args.retry_backoff,
+        "retry_budget": args.retry_budget,
+        "cache": not args.no_cache,
+        "cache_dir": os.path.join(args.data_directory, C_CACHE_DIR),
+        "cache_max_size": args.cache_max_size * 1048576,
+        "refresh": args.refresh,
+        "hedge": args.hedge,
+        "budget_dir": os.path.join(args.data_directory, C_BUDGET_DIR),
+        "daily_budget": args.api_budget,
+        "budget_mode": args.budget_mode,
+        "devices_dir": (
+            os.path.join(args.data_directory, C_DEVICES_DIR)
+            if args.incremental
+            else None
+        ),
+        "record_dir": (
+            os.path.join(args.data_directory, C_FIXTURES_DIR) if args.record else None
+        ),
+    }
+    log_writer.info(f'__Central client options: {param_dict["central_options"]}')
+
     return param_dict
 
 
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+
+    gorazd.kikelj@gmail.com
+
+"""
+from threading import Lock
+from fnmatch import fnmatch
+from docxcentral.config import (
+    C_IMAGES_DIR,
+    C_BOM_DIR,
+)
+import os
+
+
+def _scan(directory: str, patterns: tuple) -> list:
+    """
+    Return [{"name", "path", "size", "mtime"}] of files in directory
+    matching any of the patterns
+    """
+    files = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not any(fnmatch(entry.name, pattern) for pattern in patterns):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append(
+                    {
+                        "name": entry.name,
+                        "path": os.path.join(directory, entry.name),
+                        "size": stat.st_size,
+                        "mtime": stat.st_mtime,
+                    }
+                )
+    except OSError:
+        pass
+    return sorted(files, key=lambda file: file["name"])
+
+
+class AssetIndex:
+    """
+    AP images and site BOM documents found by one scan of the directories
+
+    images/<site>/<serial>-<ap name>.jpg            AP photo
+    images/<site>/<serial>-<ap name>_location.png   AP location image
+    bom/<site name>*.docx                           site BOM document
+
+    Images are indexed by site and matched with the same patterns as
+    glob.glob before: {serial}*.jpg and {serial}-*_location.png. BOM
+    document belongs to the site with the longest name that is a prefix
+    of the file name, see assign_bom(). Until sites are assigned every BOM
+    document starting with the site name is returned.
+    """
+
+    def __init__(self, images_dir: str = C_IMAGES_DIR, bom_dir: str = C_BOM_DIR):
+        self.images_dir = images_dir
+        self.bom_dir = bom_dir
+        self.images = {}
+        self.bom = None
+        self._bom_files = None
+        self._lock = Lock()
+
+    def scan(self) -> None:
+        """
+        Scan image and BOM directories. Repeated calls rescan.
+        """
+        try:
+            with os.scandir(self.images_dir) as entries:
+                sites = [entry.name for entry in entries if entry.is_dir()]
+        except OSError:
+            sites = []
+        images = {
+            site: _scan(os.path.join(self.images_dir, site), ("*.jpg", "*.png"))
+            for site in sites
+        }
+        with self._lock:
+            self.images = images
+            self._bom_files = _scan(self.bom_dir, ("*.docx",))
+        return None
+
+    def _scanned(self) -> None:
+        if self._bom_files is None:
+            self.scan()
+
+    def assign_bom(self, site_names: list) -> None:
+        """
+        Assign BOM documents to sites by the longest matching site name
+        """
+        self._scanned()
+        bom = {}
+        for file in self._bom_files:
+            matches = [name for name in site_names if file["name"].startswith(name)]
+            if matches:
+                bom.setdefault(max(matches, key=len), []).append(file)
+        self.bom = bom
+        return None
+
+    def _images(self, site: str, pattern: str) -> list:
+        self._scanned()
+        return [
+            file["path"]
+            for file in self.images.get(site, [])
+            if fnmatch(file["name"], pattern)
+        ]
+
+    def ap_photos(self, site: str, serial: str) -> list:
+        return self._images(site=site, pattern=f"{serial}*.jpg")
+
+    def ap_locations(self, site: str, serial: str) -> list:
+        return self._images(site=site, pattern=f"{serial}-*_location.png")
+
+    def bom_files(self, site_name: str) -> list:
+        self._scanned()
+        if self.bom is None:
+            files = [f for f in self._bom_files if f["name"].startswith(site_name)]
+        else:
+            files = self.bom.get(site_name, [])
+        return [file["path"] for file in files]
+
+    def statistics(self) -> dict:
+        self._scanned()
+        images = [file for files in self.images.values() for file in files]
+        return {
+            "images": len(images),
+            "images_size": sum(file["size"] for file in images),
+            "bom": len(self._bom_files),
+            "bom_size": sum(file["size"] for file in self._bom_files),
+        }
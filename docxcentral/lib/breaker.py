@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+
+    gorazd.kikelj@gmail.com
+
+"""
+from collections import deque
+from threading import Lock
+from time import monotonic
+from docxcentral.config import (
+    C_ENDPOINT_FAMILIES,
+    C_BREAKER_ERROR_RATE,
+    C_BREAKER_WINDOW,
+    C_BREAKER_MIN_REQUESTS,
+    C_BREAKER_COOLDOWN,
+)
+from docxcentral.logwriter import log_writer
+from .latency import endpoint_class
+
+"""
+Status code used by CentralClient when request was refused by open circuit
+
+"""
+C_CIRCUIT_OPEN_CODE = 598
+
+C_CLOSED = "closed"
+C_OPEN = "open"
+C_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Error rate circuit breaker of one API endpoint family
+
+    closed     requests pass. Outcomes of the last window requests are kept.
+    open       error rate of at least min_requests outcomes reached threshold.
+               Requests are refused for cooldown seconds.
+    half_open  after cooldown one probe request passes. Success closes the
+               circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        threshold: float = C_BREAKER_ERROR_RATE,
+        window: int = C_BREAKER_WINDOW,
+        min_requests: int = C_BREAKER_MIN_REQUESTS,
+        cooldown: float = C_BREAKER_COOLDOWN,
+    ) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.state = C_CLOSED
+        self.trips = 0
+        self.refused = 0
+        self.failed = 0
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe = False
+        self._lock = Lock()
+
+    def allow(self) -> bool:
+        """
+        Return True when request may be sent
+        """
+        with self._lock:
+            if self.state == C_OPEN and monotonic() - self._opened_at >= self.cooldown:
+                self.state = C_HALF_OPEN
+                self._probe = False
+            if self.state == C_CLOSED:
+                return True
+            if self.state == C_HALF_OPEN and not self._probe:
+                self._probe = True
+                return True
+            self.refused += 1
+            return False
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self.state == C_HALF_OPEN:
+                self._probe = False
+                if success:
+                    self.state = C_CLOSED
+                    self._outcomes.clear()
+                    log_writer.info(f"Circuit for {self.name} API closed")
+                else:
+                    self._open()
+                return None
+            if self.state == C_OPEN:
+                return None
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (
+                len(self._outcomes) >= self.min_requests
+                and failures / len(self._outcomes) >= self.threshold
+            ):
+                self._open()
+        return None
+
+    def fail(self) -> None:
+        """
+        Count request that failed after all retries
+        """
+        with self._lock:
+            self.failed += 1
+
+    def _open(self) -> None:
+        self.state = C_OPEN
+        self.trips += 1
+        self._opened_at = monotonic()
+        log_writer.error(
+            f"Circuit for {self.name} API opened. Requests refused for {self.cooldown}s"
+        )
+
+    def is_open(self) -> bool:
+        """
+        Return True while requests are refused
+        """
+        return self.state == C_OPEN and self.probe_in() > 0
+
+    def probe_in(self) -> float:
+        """
+        Return seconds until probe request is allowed, 0 when not open
+        """
+        if self.state != C_OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (monotonic() - self._opened_at))
+
+    def statistics(self) -> dict:
+        return {
+            "state": self.state,
+            "trips": self.trips,
+            "refused": self.refused,
+            "failed": self.failed,
+        }
+
+
+class CircuitBreakers:
+    """
+    One CircuitBreaker for every API endpoint family in families
+    """
+
+    def __init__(self, families: dict = C_ENDPOINT_FAMILIES, **kwargs) -> None:
+        self.families = families
+        self.breakers = {
+            name: CircuitBreaker(name=name, **kwargs)
+            for name in sorted(set(families.values()))
+        }
+
+    def get(self, apipath: str) -> CircuitBreaker:
+        return self.breakers[self.families[endpoint_class(apipath, self.families)]]
+
+    def refused(self, names: list) -> int:
+        return sum(self.breakers[name].refused for name in names)
+
+    def failed(self, names: list) -> int:
+        return sum(self.breakers[name].failed for name in names)
+
+    def statistics(self) -> dict:
+        return {name: breaker.statistics() for name, breaker in self.breakers.items()}
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+
+    gorazd.kikelj@gmail.com
+
+"""
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from threading import Lock
+from time import sleep
+from docxcentral.config import (
+    C_API_DAILY_BUDGET,
+    C_BUDGET_FLUSH_CALLS,
+)
+from docxcentral.logwriter import log_writer
+from .utilities import file_lock
+import hashlib
+import json
+import os
+import re
+
+"""
+Status code used by CentralClient when request was refused by call budget
+
+"""
+C_BUDGET_EXCEEDED_CODE = 597
+
+C_BUDGET_MODES = ["warn", "refuse", "defer"]
+
+
+def endpoint_key(apipath: str) -> str:
+    """
+    Return endpoint used for counting. Path is cut after the segment that
+    follows the API version, or after two segments when there is no version.
+
+    /configuration/v1/ap_settings_cli/<serial> -> /configuration/v1/ap_settings_cli
+    /configuration/full_wlan/<group> -> /configuration/full_wlan
+    """
+    segments = [segment for segment in apipath.split("/") if segment]
+    for idx, segment in enumerate(segments[:-1]):
+        if re.fullmatch(r"v\d+", segment):
+            return "/" + "/".join(segments[: idx + 2])
+    return "/" + "/".join(segments[:2])
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class CallBudget:
+    """
+    Daily Aruba Central API call counter per tenant shared by all runs
+
+    Counters are kept in one JSON file per tenant and day (UTC), merged under
+    a file lock, so parallel runs and other processes using the same file are
+    counted together:
+
+    {"date": "YYYY-MM-DD", "total": int, "calls": {"<endpoint>": int},
+     "last_run": int}
+
+    Calls of this run are also counted by phase (document section).
+
+    mode
+        warn     log when budget is exceeded
+        refuse   refuse requests when budget is exceeded
+        defer    like refuse, and wait for the next day before the run
+                 when the last run would not fit into what is left
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        tenant: str = "",
+        daily_budget: int = C_API_DAILY_BUDGET,
+        mode: str = "warn",
+        flush_calls: int = C_BUDGET_FLUSH_CALLS,
+    ) -> None:
+        tenant_id = hashlib.sha256(tenant.encode("utf_8")).hexdigest()[:16]
+        self.filename = Path(directory) / f"{tenant_id}.json"
+        self.daily_budget = daily_budget
+        self.mode = mode
+        self.flush_calls = flush_calls
+        self.phase = "setup"
+        self.phases = {}
+        self.run_calls = 0
+        self.refused = 0
+        self._pending = {}
+        self._pending_count = 0
+        self._lock = Lock()
+        self._exceeded_logged = False
+        self._used = self._read().get("total", 0)
+
+    def _read(self) -> dict:
+        try:
+            with open(self.filename, "r", encoding="utf_8") as infile:
+                state = json.load(infile)
+        except (OSError, ValueError):
+            state = {}
+        if state.get("date") != _today():
+            state = {
+                "date": _today(),
+                "total": 0,
+                "calls": {},
+                "last_run": state.get("last_run", 0),
+            }
+        return state
+
+    def _merge(self, pending: dict = {}, last_run: int = None) -> dict:
+        """
+        Add pending counts to the counter file and return its content
+        """
+        try:
+            self.filename.parent.mkdir(parents=True, exist_ok=True)
+            with file_lock(str(self.filename)):
+                state = self._read()
+                for endpoint, count in pending.items():
+                    state["calls"][endpoint] = state["calls"].get(endpoint, 0) + count
+                    state["total"] += count
+                if last_run is not None:
+                    state["last_run"] = last_run
+                tmp_filename = self.filename.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp_filename, "w", encoding="utf_8") as outfile:
+                    json.dump(state, outfile, indent=1)
+                os.replace(tmp_filename, self.filename)
+        except OSError as err:
+            log_writer.warning(f"Unable to update API call budget: {err}")
+            state = {"total": self._used}
+        return state
+
+    def remaining(self) -> int:
+        return self.daily_budget - self._used
+
+    def check_run(self) -> bool:
+        """
+        Check that the run fits into the remaining budget, estimated by the
+        calls of the last run. In defer mode wait for the next day.
+
+        Return: False when run should not start
+        """
+        state = self._merge()
+        self._used = state.get("total", 0)
+        estimate = state.get("last_run", 0)
+        log_writer.info(
+            f"API calls today {self._used} of {self.daily_budget}, last run {estimate}"
+        )
+        if not self.daily_budget or self._used + estimate <= self.daily_budget:
+            return True
+        message = (
+            f"API call budget left {self.remaining()} is less than last run {estimate}"
+        )
+        if self.mode == "refuse":
+            log_writer.error(message)
+            return False
+        if self.mode == "defer":
+            now = datetime.now(timezone.utc)
+            tomorrow = (now + timedelta(days=1)).replace(
+                hour=0, minute=0, second=1, microsecond=0
+            )
+            log_writer.warning(f"{message}. Run deferred until {tomorrow.isoformat()}")
+            sleep((tomorrow - now).total_seconds())
+            self._used = self._merge().get("total", 0)
+            return True
+        log_writer.warning(message)
+        return True
+
+    def allow(self) -> bool:
+        """
+        Return False when request has to be refused because budget is spent
+        """
+        if not self.daily_budget or self._used < self.daily_budget:
+            return True
+        with self._lock:
+            if not self._exceeded_logged:
+                self._exceeded_logged = True
+                log_writer.error(
+                    f"API call budget {self.daily_budget} for today exceeded"
+                )
+            if self.mode == "warn":
+                return True
+            self.refused += 1
+            return False
+
+    def count(self, apipath: str) -> None:
+        """
+        Count one API call sent to Aruba Central
+        """
+        endpoint = endpoint_key(apipath)
+        with self._lock:
+            self.run_calls += 1
+            self._used += 1
+            self.phases[self.phase] = self.phases.get(self.phase, 0) + 1
+            self._pending[endpoint] = self._pending.get(endpoint, 0) + 1
+            self._pending_count += 1
+            if self._pending_count < self.flush_calls:
+                return None
+            pending = self._pending
+            self._pending = {}
+            self._pending_count = 0
+            self._used = self._merge(pending).get("total", self._used)
+        return None
+
+    def flush(self, last_run: bool = False) -> None:
+        """
+        Write pending counts. With last_run store calls of this run as
+        estimate for the next run.
+        """
+        with self._lock:
+            pending = self._pending
+            self._pending = {}
+            self._pending_count = 0
+            state = self._merge(pending, self.run_calls if last_run else None)
+            self._used = state.get("total", self._used)
+        return None
+
+    def statistics(self) -> dict:
+        return {
+            "run_calls": self.run_calls,
+            "today": self._used,
+            "daily_budget": self.daily_budget,
+            "refused": self.refused,
+            "phases": dict(self.phases),
+        }
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+    
+    gorazd.kikelj@gmail.com
+    
+"""
+from pathlib import Path
+from threading import Lock
+from time import time
+from docxcentral.config import C_CACHE_TTL, C_CACHE_MAX_SIZE
+from docxcentral.logwriter import log_writer
+import hashlib
+import json
+import os
+
+
+def ttl_for_path(apipath: str, ttls: dict = C_CACHE_TTL) -> int:
+    """
+    Return cache TTL in seconds for REST API path. Longest prefix wins.
+    """
+    match = ""
+    for prefix in ttls:
+        if apipath.startswith(prefix) and len(prefix) > len(match):
+            match = prefix
+    return ttls.get(match, 0)
+
+
+class ResponseCache:
+    """
+    Persistent cache of successful GET responses
+
+    One JSON file per request, keyed by tenant, apipath and apiparams.
+    Entries expire after the TTL of their endpoint. When the cache grows
+    over max_size bytes, least recently used entries are removed.
+
+    refresh:
+        None  use cached data
+        []    ignore all cached data
+        [..]  ignore cached data for listed apipath prefixes
+    Fresh responses are always stored.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        tenant: str = "",
+        ttls: dict = C_CACHE_TTL,
+        max_size: int = C_CACHE_MAX_SIZE,
+        refresh: list = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.tenant = tenant
+        self.ttls = ttls
+        self.max_size = max_size
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = Lock()
+
+    def _key(self, apipath: str, apiparams: dict) -> str:
+        key = json.dumps(
+            [self.tenant, apipath, apiparams], sort_keys=True, default=str
+        )
+        return hashlib.sha256(key.encode("utf_8")).hexdigest()
+
+    def _filename(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _refresh_path(self, apipath: str) -> bool:
+        if self.refresh is None:
+            return False
+        if not self.refresh:
+            return True
+        return any(apipath.startswith(prefix) for prefix in self.refresh)
+
+    def get(self, apipath: str, apiparams: dict) -> dict:
+        """
+        Return cached {"code", "msg", "headers"} or None
+        """
+        ttl = ttl_for_path(apipath, self.ttls)
+        if ttl <= 0 or self._refresh_path(apipath):
+            return None
+        filename = self._filename(self._key(apipath, apiparams))
+        try:
+            with open(filename, "r", encoding="utf_8") as infile:
+                entry = json.load(infile)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if time() - entry.get("stored", 0) > ttl:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(filename)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return {"code": entry["code"], "msg": entry["msg"], "headers": {}}
+
+    def put(self, apipath: str, apiparams: dict, result: dict) -> None:
+        """
+        Store successful response for apipath with TTL
+        """
+        if result.get("code") != 200 or ttl_for_path(apipath, self.ttls) <= 0:
+            return None
+        filename = self._filename(self._key(apipath, apiparams))
+        entry = {
+            "apipath": apipath,
+            "apiparams": apiparams,
+            "stored": time(),
+            "code": result["code"],
+            "msg": result["msg"],
+        }
+        try:
+            filename.parent.mkdir(parents=True, exist_ok=True)
+            old_size = filename.stat().st_size if filename.exists() else 0
+            tmp_filename = filename.with_suffix(f".{os.getpid()}.{id(entry)}.tmp")
+            with open(tmp_filename, "w", encoding="utf_8") as outfile:
+                json.dump(entry, outfile)
+            new_size = tmp_filename.stat().st_size
+            os.replace(tmp_filename, filename)
+        except (OSError, TypeError) as err:
+            log_writer.warning(f"Unable to cache response for {apipath}: {err}")
+            return None
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += new_size - old_size
+            if self._size > self.max_size:
+                self._evict()
+        return None
+
+    def _entries(self) -> list:
+        return [path for path in self.directory.glob("*/*.json") if path.is_file()]
+
+    def _scan_size(self) -> int:
+        size = 0
+        for path in self._entries():
+            try:
+                size += path.stat().st_size
+            except OSError:
+                pass
+        return size
+
+    def _evict(self) -> None:
+        """
+        Remove least recently used entries until cache is at 90% of max_size
+        """
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        size = sum(entry[1] for entry in entries)
+        target = self.max_size * 0.9
+        removed = 0
+        for mtime, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            size -= entry_size
+            removed += 1
+        self._size = size
+        log_writer.debug(f"Response cache eviction removed {removed} entries")
+
+    def invalidate(self, prefix: str = "") -> int:
+        """
+        Remove cached entries for apipath prefix. Empty prefix clears the cache.
+
+        Return number of removed entries
+        """
+        removed = 0
+        with self._lock:
+            for path in self._entries():
+                try:
+                    with open(path, "r", encoding="utf_8") as infile:
+                        apipath = json.load(infile).get("apipath", "")
+                    if apipath.startswith(prefix):
+                        path.unlink()
+                        removed += 1
+                except (OSError, ValueError):
+                    continue
+            self._size = None
+        return removed
+
+    def statistics(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
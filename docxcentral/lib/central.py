@@ -5,14 +5,39 @@
     gorazd.kikelj@gmail.com
     
 """
-from time import sleep
-from pycentral.base import ArubaCentralBase
 from pycentral.configuration import Groups, Devices
 from pycentral.monitoring import Sites
 from icecream import ic
+from docxcentral.config import (
+    C_JOBS,
+    C_PAGE_LIMIT,
+    C_RATE_LIMIT_SECOND,
+    C_POOL_SIZE,
+    C_TOKEN_DIR,
+    C_GET_RETRY_COUNT,
+    C_RETRY_BACKOFF,
+    C_RETRY_BUDGET,
+    C_DATA_DIR,
+    C_CACHE_DIR,
+    C_CACHE_MAX_SIZE,
+    C_DOWNLOAD_CHUNK_SIZE,
+    C_BUDGET_DIR,
+    C_API_DAILY_BUDGET,
+)
 from docxcentral.logwriter import log_writer
+from .client import CentralClient
+from .retry import RetryPolicy, C_NETWORK_ERROR_CODE
+from .cache import ResponseCache
+from .fixtures import FixtureRecorder
+from .devicestore import DeviceStore, group_fingerprint
+from .budget import CallBudget
+from .utilities import save_base64_stream
+from .jsondecode import loads, iter_json_items
+from time import monotonic
+import os
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import base64
-import json
 
 """
 pycentral general functions
@@ -20,10 +45,18 @@ pycentral general functions
 """
 
 
+def _error_detail(msg: any) -> str:
+    if isinstance(msg, dict):
+        return msg.get("detail") or msg.get("description") or msg.get("error")
+    return msg
+
+
 def get_central_data(central, apipath: str, apiparams: dict = {"offset": 0}) -> dict:
     """
     Retrive prepared data from Aruba Central Instance
 
+    Retries are handled by CentralClient according to its RetryPolicy.
+
     Return : dictionary
 
         Retrived data is returned as dictionary
@@ -45,21 +78,8 @@ def get_central_data(central, apipath: str, apiparams: dict = {"offset": 0}) ->
         apiMethod=apiMethod, apiPath=apiPath, apiParams=apiParams
     )
     if base_resp["code"] >= 400:
-        if base_resp["code"] == 404:
-            log_writer.error(
-                f"Retrying GET request for {apiPath} status code {base_resp['code']} Not found"
-            )
-            return base_resp.get("msg")
-
-        log_writer.warning(
-            f"Retrying GET request for {apiPath} status code {base_resp['code']} {base_resp['msg'].get('detail')}"
-        )
-        sleep(2)
-        base_resp = central.command(
-            apiMethod=apiMethod, apiPath=apiPath, apiParams=apiParams
-        )
-        log_writer.warning(
-            f"Retried GET request for {apiPath} status code {base_resp['code']} {base_resp['msg'].get('detail')}"
+        log_writer.error(
+            f"GET request for {apiPath} failed with status code {base_resp['code']} {_error_detail(base_resp.get('msg'))}"
         )
 
     return base_resp.get("msg")
@@ -69,6 +89,8 @@ def post_central_data(central, apipath: str, apidata: dict = {}) -> dict:
     """
     Submit data collection request to Aruba Central Instance
 
+    Retries are handled by CentralClient according to its RetryPolicy.
+
     Return: dictionary
 
         Return call result as dictionary
@@ -102,25 +124,368 @@ def post_central_data(central, apipath: str, apidata: dict = {}) -> dict:
     apiData = apidata
     base_resp = central.command(apiMethod=apiMethod, apiPath=apiPath, apiData=apiData)
     if base_resp["code"] >= 400:
-        log_writer.warning(
-            f"Retrying POST request for {apiPath} status code {base_resp['code']}"
+        log_writer.error(
+            f"POST request for {apiPath} failed with status code {base_resp['code']} {_error_detail(base_resp.get('msg'))}"
         )
-        sleep(2)
-        base_resp = central.command(
-            apiMethod=apiMethod, apiPath=apiPath, apiData=apiData
+
+    return base_resp["msg"]
+
+
+def project_fields(item: dict, fields: dict) -> dict:
+    """
+    Return item with selected fields only
+
+    Parameters:
+
+    fields: dict
+        {"<field>": None} keeps the value as is,
+        {"<field>": {...}} projects dictionary or list of dictionaries
+    """
+    projected = {}
+    for field, subfields in fields.items():
+        if field not in item:
+            continue
+        value = item[field]
+        if subfields is not None:
+            if isinstance(value, list):
+                value = [
+                    project_fields(v, subfields) if isinstance(v, dict) else v
+                    for v in value
+                ]
+            elif isinstance(value, dict):
+                value = project_fields(value, subfields)
+        projected[field] = value
+    return projected
+
+
+def get_central_data_pages(
+    central,
+    apipath: str,
+    items_key: str,
+    apiparams: dict = {"offset": 0},
+    limit: int = C_PAGE_LIMIT,
+    jobs: int = C_JOBS,
+    fields: dict = None,
+):
+    """
+    Retrive all pages of paginated list from Aruba Central Instance
+
+    Return : generator
+
+        Yield each page as returned by get_central_data, in offset order.
+        First page is fetched alone to learn the total. Remaining pages are
+        fetched in parallel.
+
+    Parameters:
+
+    apipath: str
+        REST API URL for returnig data
+
+    items_key: str
+        Key of the list in the response, e.g. "aps" for /monitoring/v2/aps
+
+    apiparams: dict
+        Parameters required for data filtering. offset and limit are managed here.
+
+    limit: int
+        Requested page size
+
+    jobs: int
+        Maximum number of pages fetched in parallel
+
+    fields: dict
+        Keep only these fields of each item, see project_fields. Items are
+        projected as soon as the page is received.
+
+    """
+
+    def project(page: dict) -> dict:
+        if fields and isinstance(page, dict) and isinstance(page.get(items_key), list):
+            # responses are shared by RequestMemo and ResponseCache, do not modify
+            return page | {
+                items_key: [project_fields(item, fields) for item in page[items_key]]
+            }
+        return page
+
+    page_params = dict(apiparams)
+    page_params["offset"] = 0
+    page_params["limit"] = limit
+    first_page = project(
+        get_central_data(central=central, apipath=apipath, apiparams=page_params)
+    )
+    yield first_page
+
+    if not isinstance(first_page, dict):
+        return
+    total = first_page.get("total")
+    page_size = first_page.get("count", len(first_page.get(items_key) or []))
+    if not total or not page_size or total <= page_size:
+        return
+
+    # Central may return less than requested limit, step by actual page size
+    def get_page(offset: int) -> dict:
+        return project(
+            get_central_data(
+                central=central,
+                apipath=apipath,
+                apiparams=page_params | {"offset": offset},
+            )
         )
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        yield from executor.map(get_page, range(page_size, total, page_size))
+
+
+def get_central_data_all(
+    central,
+    apipath: str,
+    items_key: str,
+    apiparams: dict = {"offset": 0},
+    limit: int = C_PAGE_LIMIT,
+    jobs: int = C_JOBS,
+    fields: dict = None,
+) -> dict:
+    """
+    Retrive complete paginated list from Aruba Central Instance
+
+    Return : dictionary
+
+        Same shape as get_central_data with items from all pages under
+        items_key and count updated.
+
+    Parameters are the same as for get_central_data_pages.
+
+    """
+    data = None
+    for page in get_central_data_pages(
+        central=central,
+        apipath=apipath,
+        items_key=items_key,
+        apiparams=apiparams,
+        limit=limit,
+        jobs=jobs,
+        fields=fields,
+    ):
+        if data is None:
+            if not isinstance(page, dict) or page.get(items_key) is None:
+                return page
+            data = dict(page)
+            data[items_key] = list(page[items_key])
+            continue
+        if not isinstance(page, dict) or page.get(items_key) is None:
+            log_writer.error(f"Missing page for {apipath} {page}")
+            continue
+        data[items_key].extend(page[items_key])
+
+    data["count"] = len(data[items_key])
+    if data.get("total") is not None and data["count"] < data["total"]:
         log_writer.warning(
-            f"Retried POST request for {apiPath} status code {base_resp['code']}"
+            f"Received {data['count']} of {data['total']} items from {apipath}"
         )
+    return data
+
+
+def iter_central_items(
+    central,
+    apipath: str,
+    items_key: str,
+    apiparams: dict = {"offset": 0},
+    limit: int = C_PAGE_LIMIT,
+    all_pages: bool = True,
+    fields: dict = None,
+    meta: dict = None,
+):
+    """
+    Yield items of paginated list as they are parsed from the response
 
-    return base_resp["msg"]
+    Responses are streamed and decoded incrementally, so no page is held in
+    memory as a whole. Pages are requested one after another. Streamed
+    responses are not memoized or cached. With --record they are recorded.
 
+    Return : generator
 
-def connect_to_central(central_info: dict) -> None:
+    Parameters:
+
+    apipath: str
+        REST API URL for returnig data
+
+    items_key: str
+        Key of the list in the response, e.g. "aps" for /monitoring/v2/aps
+
+    apiparams: dict
+        Parameters required for data filtering. offset and limit are managed here.
+
+    limit: int
+        Requested page size
+
+    all_pages: bool
+        False returns only the first page
+
+    fields: dict
+        Keep only these fields of each item, see project_fields
+
+    meta: dict
+        Receives other fields of the last response, e.g. "total"
+
+    """
+    if meta is None:
+        meta = {}
+    offset = 0
+    while True:
+        resp = central.stream_get(
+            apiPath=apipath, apiParams=apiparams | {"offset": offset, "limit": limit}
+        )
+        if resp is None:
+            log_writer.error(f"No data returned from {apipath} offset {offset}")
+            return
+        received = 0
+        try:
+            for item in iter_json_items(
+                resp.iter_content(chunk_size=C_DOWNLOAD_CHUNK_SIZE), items_key, meta
+            ):
+                received += 1
+                yield project_fields(item, fields) if fields else item
+        except ValueError as err:
+            log_writer.error(f"Invalid response from {apipath} offset {offset}: {err}")
+            return
+        finally:
+            resp.close()
+        offset += received
+        if not all_pages or received == 0:
+            return
+        if meta.get("total") is not None and offset >= meta["total"]:
+            return
+        if meta.get("total") is None and received < limit:
+            return
+
+
+"""
+asyncio variants of the general functions
+
+pycentral is a blocking client, so every call runs in a worker thread.
+A semaphore bounds the number of requests in flight at the same time.
+
+"""
+
+
+async def run_central_call(func, semaphore: asyncio.Semaphore = None, **kwargs) -> any:
+    """
+    Run blocking Aruba Central call in worker thread
+
+    Return : result of func(**kwargs)
+
+    Parameters:
+
+    func: callable
+        Any function from this module, e.g. get_central_data or get_rf_groups
+
+    semaphore: asyncio.Semaphore
+        Limit number of concurrent calls. None means unbounded.
+
+    """
+    if semaphore is None:
+        return await asyncio.to_thread(func, **kwargs)
+    async with semaphore:
+        return await asyncio.to_thread(func, **kwargs)
+
+
+async def get_central_data_async(
+    central,
+    apipath: str,
+    apiparams: dict = {"offset": 0},
+    semaphore: asyncio.Semaphore = None,
+) -> dict:
+    """
+    Async variant of get_central_data. Same return value.
+    """
+    return await run_central_call(
+        get_central_data,
+        semaphore=semaphore,
+        central=central,
+        apipath=apipath,
+        apiparams=apiparams,
+    )
+
+
+async def post_central_data_async(
+    central,
+    apipath: str,
+    apidata: dict = {},
+    semaphore: asyncio.Semaphore = None,
+) -> dict:
+    """
+    Async variant of post_central_data. Same return value.
+    """
+    return await run_central_call(
+        post_central_data,
+        semaphore=semaphore,
+        central=central,
+        apipath=apipath,
+        apidata=apidata,
+    )
+
+
+async def _gather_central_calls(calls: list, jobs: int) -> list:
+    jobs = max(1, jobs)
+    semaphore = asyncio.Semaphore(jobs)
+    # Default executor may have fewer threads than requested jobs
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=jobs)
+    )
+    results = await asyncio.gather(
+        *[run_central_call(func, semaphore=semaphore, **kwargs) for func, kwargs in calls],
+        return_exceptions=True,
+    )
+    # One failed call must not lose results of the others
+    for idx, ((func, kwargs), result) in enumerate(zip(calls, results)):
+        if isinstance(result, OSError):  # includes requests.RequestException
+            log_writer.error(
+                f"{func.__name__} failed with status code {C_NETWORK_ERROR_CODE} {result!r}"
+            )
+            results[idx] = {"detail": f"{func.__name__} failed: {result!r}"}
+        elif isinstance(result, Exception):
+            log_writer.error(f"{func.__name__} raised {result!r}", exc_info=result)
+            results[idx] = {"detail": f"{func.__name__} raised {result!r}"}
+        elif isinstance(result, BaseException):
+            raise result
+    return results
+
+
+def gather_central_calls(calls: list, jobs: int = C_JOBS) -> list:
+    """
+    Run Aruba Central calls concurrently and wait for all of them
+
+    Return : list
+
+        Results in the same order as calls. Call that raised an exception
+        is logged and returns {"detail": "< error >"} as get_central_data
+        does for network errors. Only request and OS errors are logged with
+        C_NETWORK_ERROR_CODE, other exceptions with their traceback.
+
+    Parameters:
+
+    calls: list
+        List of (function, kwargs) tuples
+
+        [
+            (get_rf_groups, {"central": central, "group_name": "group"}),
+            (get_central_data, {"central": central, "apipath": "/path"}),
+        ]
+
+    jobs: int
+        Maximum number of requests in flight
+
+    """
+    if not calls:
+        return []
+    return asyncio.run(_gather_central_calls(calls=calls, jobs=jobs))
+
+
+def connect_to_central(central_info: dict, options: dict = {}) -> CentralClient:
     """
     Establish connection with Aruba Central instance
 
-    Return: None
+    Return: CentralClient
 
     Parameters:
 
@@ -141,17 +506,96 @@ def connect_to_central(central_info: dict) -> None:
                         "refresh_token": "< Aruba Central REST API Refresh Token >",
                      }
         }
+
+    options : dict
+        {
+            "rate_limit": < initial API calls per second >,
+            "pool_size": < keep-alive connections >,
+            "retry_count": < maximum retries for one request >,
+            "retry_backoff": < base backoff in seconds >,
+            "retry_budget": < maximum retries in the run >,
+            "cache": < True to use response cache >,
+            "cache_dir": < response cache directory >,
+            "cache_max_size": < response cache size in bytes >,
+            "refresh": < None, [] to refresh all or list of apipath prefixes >,
+            "record_dir": < directory for recorded fixtures or None >,
+            "devices_dir": < directory for incremental AP details or None >,
+            "hedge": < True to send duplicate GET for slow requests >,
+            "budget_dir": < directory for daily API call counters >,
+            "daily_budget": < daily API calls, 0 for no budget >,
+            "budget_mode": < "warn", "refuse" or "defer" >,
+        }
     """
-    token_store = {"type": "local", "path": "token"}
-    central = ArubaCentralBase(
+    token_store = {"type": "local", "path": C_TOKEN_DIR}
+    recorder = None
+    if options.get("record_dir"):
+        recorder = FixtureRecorder(directory=options["record_dir"])
+    response_cache = None
+    if options.get("cache", True) and recorder is None:
+        response_cache = ResponseCache(
+            directory=options.get("cache_dir", os.path.join(C_DATA_DIR, C_CACHE_DIR)),
+            tenant=f'{central_info.get("base_url")}/{central_info.get("customer_id")}',
+            max_size=options.get("cache_max_size", C_CACHE_MAX_SIZE),
+            refresh=options.get("refresh"),
+        )
+    central = CentralClient(
         central_info=central_info,
         token_store=token_store,
         ssl_verify=True,
         logger=log_writer,
+        rate_limit=options.get("rate_limit", C_RATE_LIMIT_SECOND),
+        retry_policy=RetryPolicy(
+            retry_count=options.get("retry_count", C_GET_RETRY_COUNT),
+            backoff=options.get("retry_backoff", C_RETRY_BACKOFF),
+            budget=options.get("retry_budget", C_RETRY_BUDGET),
+        ),
+        response_cache=response_cache,
+        pool_size=options.get("pool_size", C_POOL_SIZE),
+        recorder=recorder,
+        hedge=options.get("hedge", False),
+        call_budget=CallBudget(
+            directory=options.get("budget_dir", os.path.join(C_DATA_DIR, C_BUDGET_DIR)),
+            tenant=f'{central_info.get("base_url")}/{central_info.get("customer_id")}',
+            daily_budget=options.get("daily_budget", C_API_DAILY_BUDGET),
+            mode=options.get("budget_mode", "warn"),
+        ),
     )
+    central.device_store = None
+    if options.get("devices_dir"):
+        central.device_store = DeviceStore(
+            directory=options["devices_dir"],
+            tenant=f'{central_info.get("base_url")}/{central_info.get("customer_id")}',
+        )
     return central
 
 
+def log_central_statistics(central) -> None:
+    """
+    Log API client statistics at the end of the run
+    """
+    log_writer.info(f"API rate limiter: {central.rate_limiter.statistics()}")
+    log_writer.info(f"API connection pool: {central.pool_statistics()}")
+    log_writer.info(f"API token refreshes: {central.token_refreshes}")
+    log_writer.info(f"API retries: {central.retry_policy.statistics()}")
+    log_writer.info(f"Request memo: {central.request_memo.statistics()}")
+    log_writer.info(f"API response times: {central.latency.statistics()}")
+    log_writer.info(f"API circuit breakers: {central.circuit_breakers.statistics()}")
+    if central.call_budget is not None:
+        log_writer.info(f"API calls: {central.call_budget.statistics()}")
+    if central.hedge:
+        log_writer.info(f"Hedged requests: {central.hedge_statistics()}")
+    if central.response_cache is not None:
+        log_writer.info(f"Response cache: {central.response_cache.statistics()}")
+    if central.device_store is not None:
+        log_writer.info(f"Incremental AP details: {central.device_store.statistics()}")
+    if central.recorder is not None:
+        log_writer.info(
+            f"Recorded {central.recorder.recorded} responses into {central.recorder.directory}"
+        )
+
+    return None
+
+
 def get_per_ap_settings(central, serial_no) -> dict:
     """
     Return status data for specific AP
@@ -164,15 +608,141 @@ def get_per_ap_config(central, serial_no) -> dict:
     """
     Return current AP configuration
     """
-    cfg = get_device_configuration(central, serial_no)
-    return cfg.get("msg")
-    """
     return get_central_data(
         central=central,
         apipath=f"/configuration/v1/devices/{serial_no}/configuration",
         apiparams={"limit": 0},
     )
+
+
+def get_group_ap_cli(central, group_name) -> list:
+    """
+    Return AP configuration of the group as list of CLI lines
+    """
+    apipath = f"/configuration/v1/ap_cli/{group_name}"
+    return get_central_data(central=central, apipath=apipath)
+
+
+def assemble_ap_config(group_cli: list, ap_settings: list) -> any:
+    """
+    Assemble effective AP configuration from group AP CLI and per AP settings
+
+    Return: configuration text or error result of the failed request
+    """
+    if not isinstance(group_cli, list):
+        return group_cli
+    if not isinstance(ap_settings, list):
+        return ap_settings
+    return "\n".join(group_cli + ap_settings) + "\n"
+
+
+def get_ap_details(
+    central,
+    serial_list: list,
+    jobs: int = C_JOBS,
+    fingerprints: dict = {},
+    groups: dict = {},
+) -> dict:
+    """
+    Prefetch per AP settings and configuration for list of APs
+
+    With central.device_store (incremental mode) details of APs with an
+    unchanged fingerprint are taken from the store without API calls.
+
+    With groups the configuration is assembled locally from the AP CLI of
+    the group, fetched once per group, and per AP settings. APs without group
+    get their configuration from Aruba Central. The group AP CLI is part of
+    the fingerprint, so a changed group refetches details of its APs.
+
+    Return: dictionary
+
+        {
+            "<serial number>": {
+                "settings": < get_per_ap_settings result >,
+                "configuration": "< AP configuration >",
+            }
+        }
+
+    Parameters:
+
+    serial_list: list
+        AP serial numbers
+
+    jobs: int
+        Maximum number of requests in flight
+
+    fingerprints: dict
+        {"<serial number>": device_fingerprint(< /monitoring/v2/aps record >)}
+
+    groups: dict
+        {"<serial number>": "<group name>"}
+
     """
+    device_store = getattr(central, "device_store", None)
+    group_list = sorted(
+        {groups[serial_no] for serial_no in serial_list if groups.get(serial_no)}
+    )
+    group_cli = dict(
+        zip(
+            group_list,
+            gather_central_calls(
+                calls=[
+                    (get_group_ap_cli, {"central": central, "group_name": group_name})
+                    for group_name in group_list
+                ],
+                jobs=jobs,
+            ),
+        )
+    )
+    fingerprints = {
+        serial_no: (
+            group_fingerprint(fingerprints.get(serial_no), group_cli[groups[serial_no]])
+            if groups.get(serial_no)
+            else fingerprints.get(serial_no)
+        )
+        for serial_no in serial_list
+    }
+
+    ap_details = {}
+    fetch_list = []
+    for serial_no in serial_list:
+        if device_store is not None:
+            details = device_store.get(serial_no, fingerprints.get(serial_no))
+            if details is not None:
+                ap_details[serial_no] = details
+                continue
+        fetch_list.append(serial_no)
+
+    calls = []
+    for serial_no in fetch_list:
+        calls.append(
+            (get_per_ap_settings, {"central": central, "serial_no": serial_no})
+        )
+        if not groups.get(serial_no):
+            calls.append(
+                (get_per_ap_config, {"central": central, "serial_no": serial_no})
+            )
+    results = iter(gather_central_calls(calls=calls, jobs=jobs))
+
+    for serial_no in fetch_list:
+        settings = next(results)
+        if groups.get(serial_no):
+            configuration = assemble_ap_config(group_cli[groups[serial_no]], settings)
+        else:
+            configuration = next(results)
+        ap_details[serial_no] = {
+            "settings": settings,
+            "configuration": configuration,
+        }
+        if (
+            device_store is not None
+            and isinstance(settings, list)
+            and isinstance(configuration, str)
+        ):
+            device_store.put(
+                serial_no, fingerprints.get(serial_no), ap_details[serial_no]
+            )
+    return ap_details
 
 
 """
@@ -225,6 +795,46 @@ def get_floor_image(central, floor_id) -> any:
     )
 
 
+"""
+Leading bytes of image files accepted as floor plan images
+
+"""
+C_IMAGE_SIGNATURES = (b"\x89PNG\r\n\x1a\n", b"\xff\xd8\xff", b"GIF87a", b"GIF89a")
+
+
+def save_floor_image(
+    central, floor_id, filename: str, chunk_size: int = C_DOWNLOAD_CHUNK_SIZE
+) -> bool:
+    """
+    Stream floor plan image and decode it in chunks into filename
+
+    Decoded data has to be an image (PNG, JPEG or GIF signature). File is
+    left untouched when image did not change.
+
+    Return: True when image was saved or is unchanged, otherwise False
+    """
+    resp = central.stream_get(
+        apiPath=f"{visualrf_api}floor/{floor_id}/image", apiParams={"offset": 0}
+    )
+    if resp is None:
+        return False
+    try:
+        if save_base64_stream(
+            resp.iter_content(chunk_size=chunk_size),
+            filename,
+            signatures=C_IMAGE_SIGNATURES,
+        ):
+            log_writer.debug(f"Saved floor plan {filename}")
+        else:
+            log_writer.debug(f"Floor plan {filename} unchanged")
+    except (ValueError, OSError) as err:
+        log_writer.error(f"Floor plan {filename} not saved: {err}")
+        return False
+    finally:
+        resp.close()
+    return True
+
+
 def save_floorplan_ap_location(central, ap_id):
     """
     Need to use cookie to authorize. Currently not in working condition
@@ -244,13 +854,141 @@ def save_floorplan_ap_location(central, ap_id):
     return None
 
 
-def save_floorplans(central, central_info) -> dict:
+def _result_items(result: any, items_key: str) -> list:
+    """
+    Return list under items_key, empty list when the call failed
+    """
+    if isinstance(result, dict) and isinstance(result.get(items_key), list):
+        return result[items_key]
+    return []
+
+
+def _crawl_floor(central, building: dict, floor: dict) -> dict:
+    """
+    Save floor plan image and collect AP locations for one floor
+
+    Return: dictionary
+
+        {
+            "building_name": "< building name >",
+            "floor_name": "< floor name >",
+            "floor_id": "< floor id >",
+            "ap": {"< AP name >": "< AP id >"},
+            "timing": {"image": seconds, "access_points": seconds},
+        }
+
+    """
+    timing = {}
+    start = monotonic()
+    save_floor_image(
+        central=central,
+        floor_id=floor["floor_id"],
+        filename=f"images/{building['building_name']}_floor_{floor['floor_level']}.png",
+    )
+    timing["image"] = monotonic() - start
+
+    start = monotonic()
+    floor_data = get_floor_data(central=central, floor_id=floor["floor_id"])
+    timing["access_points"] = monotonic() - start
+
+    return {
+        "building_name": building["building_name"],
+        "floor_name": floor["floor_name"],
+        "floor_id": floor["floor_id"],
+        "ap": {
+            ap["ap_name"]: ap["ap_id"]
+            for ap in _result_items(floor_data, "access_points")
+        },
+        "timing": timing,
+    }
+
+
+def crawl_floorplans(central, jobs: int = C_JOBS) -> tuple:
+    """
+    Walk all VisualRF campuses, buildings and floors
+
+    Each level is fetched concurrently for all items of the level above it.
+    Floor plan images are saved into images/ directory.
+
+    Return: tuple (floor_dict, timings)
+
+        floor_dict = {
+            "< floor id >": {
+                "building_name": "< building name >",
+                "floor_name": "< floor name >",
+                "ap": {"< AP name >": "< AP id >"},
+            }
+        }
+
+        timings = {
+            "< floor id >": {"image": seconds, "access_points": seconds}
+        }
+
+    Floors are keyed by floor id, floor names repeat across buildings.
+
+    Parameters:
+
+    jobs: int
+        Maximum number of requests in flight
+
+    """
     campuses = get_campus_id(central=central)
+
+    buildings = []
+    for result in gather_central_calls(
+        calls=[
+            (get_buildings, {"central": central, "campus_id": campus["campus_id"]})
+            for campus in _result_items(campuses, "campus")
+        ],
+        jobs=jobs,
+    ):
+        buildings.extend(_result_items(result, "buildings"))
+
+    floors = []
+    for building, result in zip(
+        buildings,
+        gather_central_calls(
+            calls=[
+                (get_floors, {"central": central, "building_id": b["building_id"]})
+                for b in buildings
+            ],
+            jobs=jobs,
+        ),
+    ):
+        floors.extend([(building, floor) for floor in _result_items(result, "floors")])
+
     floor_dict = {}
-    buildings = get_buildings(
-        central=central, campus_id=campuses["campus"][0]["campus_id"]
-    )
+    timings = {}
+    for (building, floor), result in zip(
+        floors,
+        gather_central_calls(
+            calls=[
+                (_crawl_floor, {"central": central, "building": building, "floor": floor})
+                for building, floor in floors
+            ],
+            jobs=jobs,
+        ),
+    ):
+        if not isinstance(result, dict) or "floor_id" not in result:
+            log_writer.error(
+                f"Floor {building.get('building_name')}/{floor.get('floor_name')} "
+                f"skipped {_error_detail(result)}"
+            )
+            continue
+        floor_dict[result["floor_id"]] = {
+            "building_name": result["building_name"],
+            "floor_name": result["floor_name"],
+            "ap": result["ap"],
+        }
+        timings[result["floor_id"]] = result["timing"]
+
+    return floor_dict, timings
+
+
+def save_floorplans(central, central_info, jobs: int = C_JOBS) -> dict:
     """
+    Save floor plans of all campuses and return floor_dict of crawl_floorplans
+
     Attempt to access the floorplan image with AP automatically.
     Need to get cookie from requests module with session info
 
@@ -259,33 +997,21 @@ def save_floorplans(central, central_info) -> dict:
     ic(param_info)
     ap_location_pictures = connect_to_central(central_info=param_info)
     ic(ap_location_pictures)
-    """
-
-    for building in buildings["buildings"]:
-        floors = get_floors(central=central, building_id=building["building_id"])
-        for floor in floors["floors"]:
-            floor_dict[floor["floor_name"]] = {
-                "floor_id": floor["floor_id"],
-                "ap": {},
-            }
-            img = get_floor_image(central=central, floor_id=floor["floor_id"])
-            with open(
-                f"images/{building['building_name']}_floor_{floor['floor_level']}.png",
-                "wb",
-            ) as f:
-                f.write(img)
 
-            floor_data = get_floor_data(central=central, floor_id=floor["floor_id"])
-            for ap in floor_data["access_points"]:
-                floor_dict[floor["floor_name"]]["ap"].update(
-                    {ap["ap_name"]: ap["ap_id"]}
-                )
-    # Disabled until we know how to get image from Central
-    #
-    #                save_floorplan_ap_location(
-    #                    central=ap_location_pictures, ap_id=ap["ap_id"]
-    #                )
+    Disabled until we know how to get image from Central
 
+        save_floorplan_ap_location(
+            central=ap_location_pictures, ap_id=ap["ap_id"]
+        )
+    """
+    floor_dict, timings = crawl_floorplans(central=central, jobs=jobs)
+    for floor_id, timing in timings.items():
+        floor = floor_dict[floor_id]
+        log_writer.debug(
+            f'Floor {floor["building_name"]}/{floor["floor_name"]}: '
+            f'image {timing["image"]:.2f}s, '
+            f'AP locations {timing["access_points"]:.2f}s'
+        )
     return floor_dict
 
 
@@ -306,7 +1032,7 @@ def get_wlan_list(central, group_name) -> dict:
     data = get_central_data(central=central, apipath=apipath)
     if type(data) is dict:
         return data.get("description")
-    return json.loads(data)
+    return loads(data)
 
 
 def get_sites(central) -> list:
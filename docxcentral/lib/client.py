@@ -0,0 +1,529 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+    
+    gorazd.kikelj@gmail.com
+    
+"""
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ThreadPoolExecutor,
+    TimeoutError as FutureTimeoutError,
+    wait,
+)
+from threading import Lock
+from time import monotonic, sleep, time
+from urllib.parse import urlparse
+from pycentral.base import ArubaCentralBase, BearerAuth, SUPPORTED_METHODS
+from pycentral.base_utils import get_url, tokenLocalStoreUtil
+from requests.adapters import HTTPAdapter
+from docxcentral.config import (
+    C_RATE_LIMIT_SECOND,
+    C_POOL_SIZE,
+    C_TOKEN_REFRESH_MARGIN,
+    C_TIMEOUTS,
+    C_HEDGE_PERCENTILE,
+    C_HEDGE_MIN_DELAY,
+)
+from .ratelimit import RateLimiter
+from .retry import RetryPolicy, C_NETWORK_ERROR_CODE
+from .cache import ResponseCache
+from .memo import RequestMemo
+from .fixtures import FixtureRecorder
+from .tokenstore import read_token, write_token, token_expiring
+from .utilities import file_lock
+from .jsondecode import loads
+from .latency import LatencyTracker, endpoint_class
+from .breaker import CircuitBreakers, C_CIRCUIT_OPEN_CODE
+from .budget import CallBudget, C_BUDGET_EXCEEDED_CODE
+import json
+import requests
+
+
+class CentralClient(ArubaCentralBase):
+    """
+    ArubaCentralBase used by docxcentral
+
+    Every HTTP request, including the ones made by pycentral modules
+    (Sites, Groups, Inventory, ...), is paced by one shared RateLimiter
+    and retried according to one shared RetryPolicy. Identical GET requests
+    within the run are answered once through RequestMemo. GET responses are
+    served from ResponseCache when one is given.
+
+    All requests share one keep-alive requests.Session with a connection
+    pool of pool_size connections per host and gzip/deflate responses.
+
+    With recorder every response received is written as replay fixture.
+
+    Token file is shared by threads and processes under a file lock. Token
+    is refreshed token_refresh_margin seconds before it expires, and only
+    once when many requests see it expire at the same time.
+
+    Requests use (connect, read) timeouts of their endpoint class in timeouts.
+    With hedge a GET request still running after C_HEDGE_PERCENTILE of the
+    recent response times of its endpoint class is sent once more and the
+    first response received is used.
+
+    Requests of an API endpoint family with open circuit in circuit_breakers
+    are refused with status code C_CIRCUIT_OPEN_CODE and are not retried.
+    Responses served from request_memo and response_cache are not affected.
+
+    Every request sent is counted in call_budget. When the daily budget is
+    spent, requests may be refused with status code C_BUDGET_EXCEEDED_CODE.
+    """
+
+    def __init__(
+        self,
+        central_info: dict,
+        token_store: dict = None,
+        logger=None,
+        ssl_verify: bool = True,
+        rate_limit: float = C_RATE_LIMIT_SECOND,
+        retry_policy: RetryPolicy = None,
+        response_cache: ResponseCache = None,
+        pool_size: int = C_POOL_SIZE,
+        recorder: FixtureRecorder = None,
+        token_refresh_margin: float = C_TOKEN_REFRESH_MARGIN,
+        timeouts: dict = C_TIMEOUTS,
+        hedge: bool = False,
+        circuit_breakers: CircuitBreakers = None,
+        call_budget: CallBudget = None,
+    ) -> None:
+        self.rate_limiter = RateLimiter(rate=rate_limit)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.response_cache = response_cache
+        self.request_memo = RequestMemo()
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        self.session.headers["Accept-Encoding"] = "gzip, deflate"
+        # hedged requests may double the connections in use
+        self._adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=2 * pool_size if hedge else pool_size,
+            max_retries=0,
+        )
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self.compressed_responses = 0
+        self.recorder = recorder
+        self.token_refresh_margin = token_refresh_margin
+        self.token_refreshes = 0
+        self._token_lock = Lock()
+        self.timeouts = timeouts
+        self.latency = LatencyTracker()
+        self.hedge = hedge
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._hedge_lock = Lock()
+        self._hedge_executor = None
+        self.circuit_breakers = circuit_breakers or CircuitBreakers()
+        self.call_budget = call_budget
+        super().__init__(
+            central_info=central_info,
+            token_store=token_store,
+            logger=logger,
+            ssl_verify=ssl_verify,
+        )
+
+    def requestUrl(
+        self, url, data={}, method="GET", headers={}, params={}, files={}, stream=False
+    ):
+        """
+        Same as ArubaCentralBase.requestUrl over the shared session
+
+        With stream response body is not read, except while recording. Then
+        the body is read for the fixture and iter_content() yields it from
+        memory, so streamed lists and downloads are replayed too.
+
+        Return: requests.Response or None when request failed
+        """
+        if method not in SUPPORTED_METHODS:
+            self.logger.error(f"HTTP method '{method}' not supported.. ")
+
+        if token_expiring(self.central_info["token"], self.token_refresh_margin):
+            self._refresh_shared_token(stale=self.central_info["token"])
+
+        req = requests.Request(
+            method=method,
+            url=url,
+            headers=headers,
+            files=files,
+            auth=BearerAuth(self.central_info["token"]["access_token"]),
+            params=params,
+            data=data,
+        )
+        prepped = self.session.prepare_request(req)
+        settings = self.session.merge_environment_settings(
+            prepped.url, {}, stream, self.ssl_verify, None
+        )
+        endpoint = endpoint_class(urlparse(url).path, self.timeouts)
+        self.rate_limiter.acquire()
+        if self.call_budget is not None:
+            self.call_budget.count(urlparse(url).path)
+        start = monotonic()
+        try:
+            resp = self.session.send(
+                prepped, timeout=self.timeouts[endpoint], **settings
+            )
+        except Exception as err:
+            self.logger.error(f"Failed making request to URL {url} with error {err}")
+            return None
+        self.latency.add(endpoint, monotonic() - start)
+
+        self.rate_limiter.update(resp.headers)
+        if resp.headers.get("Content-Encoding") in ["gzip", "deflate"]:
+            self.compressed_responses += 1
+        if self.recorder is not None:
+            self.recorder.record(method=method, url=url, params=params, resp=resp)
+        return resp
+
+    def _hedged_request(self, url, method="GET", **kwargs):
+        """
+        requestUrl with a duplicate GET request when the first one is slow
+
+        Return: first requests.Response received or None
+        """
+        delay = None
+        if self.hedge and method == "GET":
+            delay = self.latency.percentile(
+                endpoint_class(urlparse(url).path, self.timeouts), C_HEDGE_PERCENTILE
+            )
+        if delay is None:
+            return self.requestUrl(url=url, method=method, **kwargs)
+
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=2 * self.pool_size, thread_name_prefix="hedge"
+                )
+        first = self._hedge_executor.submit(
+            self.requestUrl, url=url, method=method, **kwargs
+        )
+        try:
+            return first.result(timeout=max(delay, C_HEDGE_MIN_DELAY))
+        except FutureTimeoutError:
+            pass
+
+        second = self._hedge_executor.submit(
+            self.requestUrl, url=url, method=method, **kwargs
+        )
+        with self._hedge_lock:
+            self.hedged += 1
+        done, pending = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = second if second in done and first not in done else first
+        resp = winner.result()
+        if resp is None:
+            winner = second if winner is first else first
+            resp = winner.result()
+        if winner is second and resp is not None:
+            with self._hedge_lock:
+                self.hedge_wins += 1
+        return resp
+
+    def hedge_statistics(self) -> dict:
+        return {"hedged": self.hedged, "hedge_wins": self.hedge_wins}
+
+    def _token_filename(self) -> str:
+        return tokenLocalStoreUtil(
+            self.token_store,
+            self.central_info.get("customer_id"),
+            self.central_info.get("client_id"),
+        )
+
+    def loadToken(self) -> dict:
+        """
+        Load token from shared token file. Refresh it when it is about to expire.
+        """
+        filename = self._token_filename()
+        with file_lock(filename):
+            token = read_token(filename)
+        if token is None:
+            return None
+        self.logger.info(f"Loaded token from storage from file: {filename}")
+        if token_expiring(token, self.token_refresh_margin):
+            token = self._refresh_shared_token(stale=token)
+        return token
+
+    def storeToken(self, token: dict) -> bool:
+        filename = self._token_filename()
+        with file_lock(filename):
+            stored = write_token(filename, token)
+        if stored:
+            self.logger.info(f"Stored Aruba Central token in file {filename}")
+        return stored
+
+    def handleTokenExpiry(self) -> None:
+        self.logger.info("Handling Token Expiry...")
+        self._refresh_shared_token(stale=self.central_info.get("token"))
+
+    def _refresh_shared_token(self, stale: dict) -> dict:
+        """
+        Replace stale token once for all threads and processes
+
+        When another thread or process already stored a newer token, that
+        token is used without calling Aruba Central.
+        """
+        stale_access_token = (stale or {}).get("access_token")
+        with self._token_lock:
+            current = self.central_info.get("token")
+            if (
+                current
+                and current.get("access_token") != stale_access_token
+                and not token_expiring(current, self.token_refresh_margin)
+            ):
+                return current
+
+            filename = self._token_filename()
+            with file_lock(filename):
+                token = read_token(filename)
+                if (
+                    token is None
+                    or token.get("access_token") == stale_access_token
+                    or token_expiring(token, self.token_refresh_margin)
+                ):
+                    token = self.refreshToken(stale or {})
+                    if token:
+                        self.logger.info("Access token refreshed!")
+                    else:
+                        self.logger.info("Attemping to create new token...")
+                        token = self.createToken()
+                    if token:
+                        token["created_at"] = time()
+                        write_token(filename, token)
+                        self.token_refreshes += 1
+
+            if token:
+                self.central_info["token"] = token
+            else:
+                self.logger.error("Failed to get API access token")
+            return token
+
+    def pool_statistics(self) -> dict:
+        """
+        Return connection reuse statistics of the shared session
+        """
+        connections = 0
+        requests_sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            requests_sent += pool.num_requests
+        return {
+            "pool_size": self.pool_size,
+            "requests": requests_sent,
+            "connections": connections,
+            "reused": requests_sent - connections,
+            "compressed": self.compressed_responses,
+        }
+
+    def command(
+        self, apiMethod, apiPath, apiData={}, apiParams={}, headers={}, files={}
+    ) -> dict:
+        """
+        Same as ArubaCentralBase.command with RetryPolicy for 429, 5xx and
+        network errors. Network errors are returned with status code
+        C_NETWORK_ERROR_CODE instead of terminating the program.
+
+        GET requests go through request_memo and response_cache.
+
+        Return: {"code": int, "msg": any, "headers": dict}
+        """
+        if apiMethod != "GET":
+            return self._command(
+                apiMethod=apiMethod,
+                apiPath=apiPath,
+                apiData=apiData,
+                apiParams=apiParams,
+                headers=headers,
+                files=files,
+            )
+
+        return self.request_memo.call(
+            method=apiMethod,
+            apipath=apiPath,
+            apiparams=apiParams,
+            func=lambda: self._cached_command(
+                apiMethod=apiMethod,
+                apiPath=apiPath,
+                apiParams=apiParams,
+                headers=headers,
+            ),
+        )
+
+    def _cached_command(self, apiMethod, apiPath, apiParams={}, headers={}) -> dict:
+        """
+        GET request served from response_cache when possible
+        """
+        use_cache = self.response_cache is not None
+        if use_cache:
+            result = self.response_cache.get(apipath=apiPath, apiparams=apiParams)
+            if result is not None:
+                return result
+
+        result = self._command(
+            apiMethod=apiMethod,
+            apiPath=apiPath,
+            apiParams=apiParams,
+            headers=headers,
+        )
+        if use_cache:
+            self.response_cache.put(apipath=apiPath, apiparams=apiParams, result=result)
+        return result
+
+    def stream_get(self, apiPath, apiParams={}):
+        """
+        GET request for large downloads with response body not read
+
+        Request is paced, retried, token refreshed and recorded as any other
+        request, but it is not memoized or cached.
+
+        Return: requests.Response with status code 200 or None. Caller reads
+        the body with iter_content() and closes the response.
+        """
+        url = get_url(self.central_info["base_url"], apiPath, query=apiParams)
+        breaker = self.circuit_breakers.get(apiPath)
+        attempt = 0
+        token_refreshed = False
+        while True:
+            if not breaker.allow():
+                self.logger.error(
+                    f"Download of {apiPath} refused, {breaker.name} circuit open"
+                )
+                return None
+            if self.call_budget is not None and not self.call_budget.allow():
+                self.logger.error(f"Download of {apiPath} refused, API budget spent")
+                return None
+            request_token = self.central_info["token"]
+            resp = self.requestUrl(
+                url=url,
+                method="GET",
+                headers={"Accept": "application/json"},
+                params=apiParams,
+                stream=True,
+            )
+            if resp is None:
+                result = {
+                    "code": C_NETWORK_ERROR_CODE,
+                    "msg": {"detail": f"No response from {apiPath}"},
+                    "headers": {},
+                }
+            elif resp.status_code == 200:
+                breaker.record(success=True)
+                return resp
+            else:
+                result = {
+                    "code": resp.status_code,
+                    "msg": resp.text,
+                    "headers": dict(resp.headers),
+                }
+                resp.close()
+                if (
+                    resp.status_code == 401
+                    and "invalid_token" in result["msg"]
+                    and not token_refreshed
+                ):
+                    self._refresh_shared_token(stale=request_token)
+                    token_refreshed = True
+                    continue
+
+            breaker.record(success=result["code"] < 500)
+            delay = None
+            if not breaker.is_open():
+                delay = self.retry_policy.retry_delay(result=result, attempt=attempt)
+            if delay is None:
+                self.logger.error(
+                    f"Download of {apiPath} failed with status code {result['code']}"
+                )
+                if result["code"] >= 500:
+                    breaker.fail()
+                return None
+            self.logger.warning(
+                f"Retrying download of {apiPath} status code {result['code']} in {delay:.1f}s"
+            )
+            sleep(delay)
+            attempt += 1
+
+    def _command(
+        self, apiMethod, apiPath, apiData={}, apiParams={}, headers={}, files={}
+    ) -> dict:
+        """
+        Send request to Aruba Central with token refresh and retries
+        """
+        url = get_url(self.central_info["base_url"], apiPath, query=apiParams)
+        if not headers and not files:
+            headers = {
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            }
+        if apiData and headers["Content-Type"] == "application/json":
+            apiData = json.dumps(apiData)
+
+        breaker = self.circuit_breakers.get(apiPath)
+        attempt = 0
+        token_refreshed = False
+        while True:
+            if not breaker.allow():
+                return {
+                    "code": C_CIRCUIT_OPEN_CODE,
+                    "msg": {"detail": f"Circuit for {breaker.name} API is open"},
+                    "headers": {},
+                }
+            if self.call_budget is not None and not self.call_budget.allow():
+                return {
+                    "code": C_BUDGET_EXCEEDED_CODE,
+                    "msg": {"detail": "Daily API call budget exceeded"},
+                    "headers": {},
+                }
+            request_token = self.central_info["token"]
+            resp = self._hedged_request(
+                url=url,
+                data=apiData,
+                method=apiMethod,
+                headers=headers,
+                params=apiParams,
+                files=files,
+            )
+            if resp is None:
+                result = {
+                    "code": C_NETWORK_ERROR_CODE,
+                    "msg": {"detail": f"No response from {apiPath}"},
+                    "headers": {},
+                }
+            elif (
+                resp.status_code == 401
+                and "invalid_token" in resp.text
+                and not token_refreshed
+            ):
+                self.logger.error(
+                    f"Received error 401 on requesting url {url} with resp {resp.text}"
+                )
+                self._refresh_shared_token(stale=request_token)
+                token_refreshed = True
+                continue
+            else:
+                result = {
+                    "code": resp.status_code,
+                    "msg": resp.text,
+                    "headers": dict(resp.headers),
+                }
+                try:
+                    result["msg"] = loads(result["msg"])
+                except ValueError:
+                    pass
+
+            breaker.record(success=result["code"] < 500)
+            delay = None
+            if not breaker.is_open():
+                delay = self.retry_policy.retry_delay(result=result, attempt=attempt)
+            if delay is None:
+                if result["code"] >= 500:
+                    breaker.fail()
+                return result
+            self.logger.warning(
+                f"Retrying {apiMethod} request for {apiPath} status code {result['code']} in {delay:.1f}s"
+            )
+            sleep(delay)
+            attempt += 1
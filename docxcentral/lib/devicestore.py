@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+    
+    gorazd.kikelj@gmail.com
+    
+"""
+from pathlib import Path
+from threading import Lock
+from time import time
+from docxcentral.config import C_FINGERPRINT_FIELDS, C_DEVICES_MAX_AGE
+from docxcentral.logwriter import log_writer
+import hashlib
+import json
+import os
+
+
+def device_fingerprint(item: dict, fields: list = C_FINGERPRINT_FIELDS) -> str:
+    """
+    Return fingerprint of /monitoring/v2/aps record. Fingerprint changes
+    when any of the fields changes.
+    """
+    values = [item.get(field) for field in fields]
+    return hashlib.sha256(
+        json.dumps(values, sort_keys=True, default=str).encode("utf_8")
+    ).hexdigest()
+
+
+def group_fingerprint(fingerprint: str, group_cli: list) -> str:
+    """
+    Return fingerprint that also changes when AP CLI of the group changes.
+    None when group AP CLI is not available.
+    """
+    if not fingerprint or not isinstance(group_cli, list):
+        return None
+    return hashlib.sha256(
+        json.dumps([fingerprint, group_cli]).encode("utf_8")
+    ).hexdigest()
+
+
+class DeviceStore:
+    """
+    Detail data of each AP from the previous runs
+
+    One JSON file per serial number:
+    {"fingerprint": "", "stored": timestamp, "details": {...}}
+
+    Stored details are reused while the fingerprint of the AP is unchanged
+    and they are not older than max_age seconds (0 means no limit).
+    """
+
+    def __init__(
+        self, directory: str, tenant: str = "", max_age: int = C_DEVICES_MAX_AGE
+    ) -> None:
+        tenant_id = hashlib.sha256(tenant.encode("utf_8")).hexdigest()[:16]
+        self.directory = Path(directory) / tenant_id
+        self.max_age = max_age
+        self.reused = 0
+        self.fetched = 0
+        self._lock = Lock()
+
+    def _filename(self, serial_no: str) -> Path:
+        return self.directory / f"{serial_no}.json"
+
+    def get(self, serial_no: str, fingerprint: str) -> dict:
+        """
+        Return stored details when fingerprint is unchanged and details are
+        not too old, otherwise None
+        """
+        if not fingerprint:
+            return None
+        try:
+            with open(self._filename(serial_no), "r", encoding="utf_8") as infile:
+                entry = json.load(infile)
+        except (OSError, ValueError):
+            return None
+        if entry.get("fingerprint") != fingerprint:
+            return None
+        if self.max_age and time() - entry.get("stored", 0) > self.max_age:
+            return None
+        with self._lock:
+            self.reused += 1
+        return entry.get("details")
+
+    def put(self, serial_no: str, fingerprint: str, details: dict) -> None:
+        with self._lock:
+            self.fetched += 1
+        if not fingerprint:
+            return None
+        filename = self._filename(serial_no)
+        tmp_filename = filename.with_suffix(f".{os.getpid()}.tmp")
+        entry = {"fingerprint": fingerprint, "stored": time(), "details": details}
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(tmp_filename, "w", encoding="utf_8") as outfile:
+                json.dump(entry, outfile)
+            os.replace(tmp_filename, filename)
+        except (OSError, TypeError) as err:
+            log_writer.warning(f"Unable to store details for {serial_no}: {err}")
+        return None
+
+    def statistics(self) -> dict:
+        return {"reused": self.reused, "fetched": self.fetched}
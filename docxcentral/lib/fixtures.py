@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+    
+    gorazd.kikelj@gmail.com
+    
+    Record Aruba Central API responses as fixtures for
+    docxcentral.lib.replay.
+
+    python -m docxcentral --record
+"""
+from pathlib import Path
+from threading import Lock
+from urllib.parse import urlparse
+from docxcentral.logwriter import log_writer
+import hashlib
+import json
+import os
+
+
+def _normalize_params(params: dict) -> dict:
+    return {str(key): str(value) for key, value in (params or {}).items()}
+
+
+def fixture_key(method: str, apipath: str, apiparams: dict) -> str:
+    key = json.dumps([method, apipath, _normalize_params(apiparams)], sort_keys=True)
+    return hashlib.sha256(key.encode("utf_8")).hexdigest()
+
+
+class FixtureRecorder:
+    """
+    Write every Aruba Central response into fixture directory
+
+    One JSON file per request:
+    {"method", "apipath", "apiparams", "code", "headers", "body"}
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.recorded = 0
+        self._lock = Lock()
+
+    def record(self, method: str, url: str, params: dict, resp) -> None:
+        apipath = urlparse(url).path
+        fixture = {
+            "method": method,
+            "apipath": apipath,
+            "apiparams": _normalize_params(params),
+            "code": resp.status_code,
+            "headers": {"Content-Type": resp.headers.get("Content-Type", "")},
+            "body": resp.text,
+        }
+        filename = self.directory / f"{fixture_key(method, apipath, params)}.json"
+        tmp_filename = filename.with_suffix(f".{os.getpid()}.{id(fixture)}.tmp")
+        try:
+            with open(tmp_filename, "w", encoding="utf_8") as outfile:
+                json.dump(fixture, outfile, indent=1)
+            os.replace(tmp_filename, filename)
+        except OSError as err:
+            log_writer.error(f"Unable to record fixture for {apipath}: {err}")
+            return None
+        with self._lock:
+            self.recorded += 1
+        return None
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+
+    gorazd.kikelj@gmail.com
+
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from docxcentral.config import (
+    C_IMAGE_DPI,
+    C_IMAGE_QUALITY,
+)
+from docxcentral.logwriter import log_writer
+from .utilities import file_sha256
+import os
+
+try:
+    from PIL import Image
+except ImportError:  # optional, images are embedded unchanged
+    Image = None
+
+
+_pillow_logged = False
+
+
+def target_pixels(width_cm: float, dpi: int = C_IMAGE_DPI) -> int:
+    """
+    Return image width in pixels for print width at dpi
+    """
+    return max(1, round(width_cm / 2.54 * dpi))
+
+
+def normalize_image(
+    filename: str,
+    width_cm: float,
+    cache_dir: str,
+    dpi: int = C_IMAGE_DPI,
+    quality: int = C_IMAGE_QUALITY,
+) -> str:
+    """
+    Downsample image to dpi for print width and recompress it
+
+    Result is kept in cache_dir under sha256 of the image content with the
+    original file name, so every image is processed once. JPEG stays JPEG
+    (EXIF and ICC profile are kept), other formats are saved as PNG. Images
+    that are not larger than needed are not changed.
+
+    Return: filename of the image to embed, original filename on error
+    """
+    if Image is None:
+        return filename
+    digest = file_sha256(filename)
+    if digest is None:
+        return filename
+    width = target_pixels(width_cm=width_cm, dpi=dpi)
+    try:
+        with Image.open(filename) as image:
+            is_jpeg = image.format == "JPEG"
+            name = Path(filename).name if is_jpeg else f"{Path(filename).stem}.png"
+            cached = Path(cache_dir) / f"{digest}-{width}-{quality}" / name
+            if cached.exists():
+                return str(cached)
+            if image.width <= width:
+                return filename
+            if image.mode == "P":
+                image = image.convert("RGBA")
+            info = image.info
+            image.thumbnail((width, image.height), Image.LANCZOS)
+            cached.parent.mkdir(parents=True, exist_ok=True)
+            tmp_filename = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")
+            if is_jpeg:
+                image.save(
+                    tmp_filename,
+                    format="JPEG",
+                    quality=quality,
+                    optimize=True,
+                    dpi=(dpi, dpi),
+                    exif=info.get("exif", b""),
+                    icc_profile=info.get("icc_profile"),
+                )
+            else:
+                image.save(tmp_filename, format="PNG", optimize=True, dpi=(dpi, dpi))
+            os.replace(tmp_filename, cached)
+    except (OSError, ValueError) as err:
+        log_writer.warning(f"Image {filename} embedded unchanged: {err}")
+        return filename
+    return str(cached)
+
+
+def normalize_images(
+    images: dict, cache_dir: str, dpi: int = C_IMAGE_DPI, jobs: int = 1
+) -> dict:
+    """
+    Normalize images in parallel
+
+    Return: dict {filename: filename of the image to embed}
+
+    Parameters:
+
+        images: dict
+            {filename: print width in cm}
+
+        dpi: int
+            Target resolution, 0 keeps original images
+    """
+    global _pillow_logged
+    if not images or not dpi:
+        return {}
+    if Image is None:
+        if not _pillow_logged:
+            _pillow_logged = True
+            log_writer.warning("Pillow is not installed. Images embedded unchanged.")
+        return {}
+
+    def normalize(item: tuple) -> str:
+        return normalize_image(
+            filename=item[0], width_cm=item[1], cache_dir=cache_dir, dpi=dpi
+        )
+
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        return dict(zip(images, executor.map(normalize, images.items())))
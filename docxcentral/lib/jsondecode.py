@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+
+    gorazd.kikelj@gmail.com
+
+"""
+import codecs
+import json
+
+try:
+    import orjson
+except ImportError:  # optional fast backend
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # optional incremental parser
+    ijson = None
+
+
+_WHITESPACE = " \t\r\n"
+_NUMBER = "0123456789+-.eE"
+_decoder = json.JSONDecoder()
+
+
+def loads(data) -> any:
+    """
+    Decode JSON document with orjson when installed, json otherwise
+
+    Raise: ValueError when data is not valid JSON
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class _ChunkReader:
+    """
+    File like object over iterable of bytes chunks for ijson
+    """
+
+    def __init__(self, chunks) -> None:
+        self._chunks = iter(chunks)
+        self._buffer = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _ijson_items(chunks, items_key: str, meta: dict):
+    item_prefix = f"{items_key}.item"
+    builder = None
+    builder_prefix = None
+    for prefix, event, value in ijson.parse(_ChunkReader(chunks), use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == builder_prefix and event in ("end_map", "end_array"):
+                if builder_prefix == item_prefix:
+                    yield builder.value
+                else:
+                    meta[builder_prefix] = builder.value
+                builder = None
+            continue
+        if prefix in ("", items_key) or event == "map_key":
+            continue
+        if event in ("start_map", "start_array"):
+            builder = ijson.ObjectBuilder()
+            builder_prefix = prefix
+            builder.event(event, value)
+        elif prefix == item_prefix:
+            yield value
+        else:
+            meta[prefix] = value
+
+
+class _TextStream:
+    """
+    Text buffer over iterable of bytes chunks for json.JSONDecoder.raw_decode
+    """
+
+    def __init__(self, chunks) -> None:
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder("utf_8")()
+        self.text = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self) -> bool:
+        if self.eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.text += self._decoder.decode(b"", final=True)
+            self.eof = True
+        else:
+            self.text += self._decoder.decode(chunk)
+        if self.pos > 65536:
+            self.text = self.text[self.pos :]
+            self.pos = 0
+        return True
+
+    def skip_whitespace(self) -> str:
+        """
+        Return next non whitespace character without consuming it
+        """
+        while True:
+            while self.pos < len(self.text) and self.text[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.more():
+                raise ValueError("Unexpected end of JSON document")
+
+    def expect(self, chars: str) -> str:
+        char = self.skip_whitespace()
+        if char not in chars:
+            raise ValueError(f"Expected {chars!r} at position {self.pos}")
+        self.pos += 1
+        return char
+
+    def value(self) -> any:
+        """
+        Decode next complete JSON value
+        """
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except ValueError:
+                if not self.more():
+                    raise
+                continue
+            # number or literal at the end of buffer may continue in next chunk,
+            # "1." or "1e" decode as 1 with the rest of the number left over
+            tail = end
+            if isinstance(value, (int, float)):
+                while tail < len(self.text) and self.text[tail] in _NUMBER:
+                    tail += 1
+            if tail == len(self.text) and self.more():
+                continue
+            self.pos = end
+            return value
+
+
+def _raw_decode_items(chunks, items_key: str, meta: dict):
+    stream = _TextStream(chunks)
+    stream.expect("{")
+    if stream.skip_whitespace() == "}":
+        return
+    while True:
+        key = stream.value()
+        stream.expect(":")
+        if key == items_key and stream.skip_whitespace() == "[":
+            stream.expect("[")
+            if stream.skip_whitespace() == "]":
+                stream.expect("]")
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.expect(",]") == "]":
+                        break
+        else:
+            meta[key] = stream.value()
+        if stream.expect(",}") == "}":
+            return
+
+
+def iter_json_items(chunks, items_key: str, meta: dict = None):
+    """
+    Yield items of the list under items_key of JSON object as they are parsed
+
+    Uses ijson when installed, json.JSONDecoder.raw_decode otherwise.
+
+    Return: generator
+
+    Raise: ValueError when document is not valid JSON
+
+    Parameters:
+
+        chunks: iterable
+            bytes chunks of JSON document, e.g. requests.Response.iter_content()
+
+        items_key: str
+            Key of the list in the top level object, e.g. "aps"
+
+        meta: dict
+            Receives other top level fields of the object, e.g. "total"
+    """
+    if meta is None:
+        meta = {}
+    if ijson is not None:
+        try:
+            yield from _ijson_items(chunks, items_key, meta)
+        except ijson.JSONError as err:
+            raise ValueError(str(err)) from err
+        return
+    yield from _raw_decode_items(chunks, items_key, meta)
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+
+    gorazd.kikelj@gmail.com
+
+"""
+from collections import deque
+from threading import Lock
+from docxcentral.config import (
+    C_TIMEOUTS,
+    C_HEDGE_MIN_SAMPLES,
+    C_LATENCY_WINDOW,
+)
+
+
+def endpoint_class(apipath: str, classes: dict = C_TIMEOUTS) -> str:
+    """
+    Return endpoint class of REST API path. Longest prefix wins, "" is default.
+    """
+    match = ""
+    for prefix in classes:
+        if apipath.startswith(prefix) and len(prefix) > len(match):
+            match = prefix
+    return match
+
+
+class LatencyTracker:
+    """
+    Response times of the last window requests per endpoint class
+    """
+
+    def __init__(
+        self, window: int = C_LATENCY_WINDOW, min_samples: int = C_HEDGE_MIN_SAMPLES
+    ) -> None:
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = Lock()
+
+    def add(self, endpoint: str, seconds: float) -> None:
+        with self._lock:
+            if endpoint not in self._samples:
+                self._samples[endpoint] = deque(maxlen=self.window)
+            self._samples[endpoint].append(seconds)
+
+    def percentile(self, endpoint: str, percent: float) -> float:
+        """
+        Return percentile of response times or None when there are not
+        enough samples yet
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(endpoint, []))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percent / 100))]
+
+    def statistics(self) -> dict:
+        with self._lock:
+            endpoints = {key: sorted(value) for key, value in self._samples.items()}
+        return {
+            endpoint or "default": {
+                "count": len(samples),
+                "p50": round(samples[len(samples) // 2], 3),
+                "p95": round(samples[min(len(samples) - 1, len(samples) * 95 // 100)], 3),
+                "max": round(samples[-1], 3),
+            }
+            for endpoint, samples in endpoints.items()
+        }
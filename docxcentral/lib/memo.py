@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+    
+    gorazd.kikelj@gmail.com
+    
+"""
+from concurrent.futures import Future
+from threading import Lock
+from docxcentral.config import C_MEMO_EXCLUDE
+import json
+
+
+class RequestMemo:
+    """
+    Run scoped memo of API responses keyed by (method, apipath, apiparams)
+
+    Identical requests made while the first one is still in flight wait for
+    its result instead of sending another request. Error responses and
+    responses of paths starting with any of exclude are handed to waiting
+    callers but are not remembered.
+
+    Callers get the same response object. Treat it as read only.
+    """
+
+    def __init__(self, exclude: list = C_MEMO_EXCLUDE) -> None:
+        self.exclude = tuple(exclude)
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _key(method: str, apipath: str, apiparams: dict) -> str:
+        return json.dumps([method, apipath, apiparams], sort_keys=True, default=str)
+
+    def call(self, method: str, apipath: str, apiparams: dict, func) -> dict:
+        """
+        Return memoized result of func() for the request
+
+        func returns {"code": int, "msg": any, "headers": dict}
+        """
+        key = self._key(method, apipath, apiparams)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = Future()
+                self._entries[key] = entry
+                self.misses += 1
+                owner = True
+            else:
+                self.hits += 1
+                if not entry.done():
+                    self.coalesced += 1
+                owner = False
+
+        if not owner:
+            return entry.result()
+
+        try:
+            result = func()
+        except BaseException as err:
+            with self._lock:
+                self._entries.pop(key, None)
+            entry.set_exception(err)
+            raise
+        if result.get("code", 0) >= 400 or apipath.startswith(self.exclude):
+            with self._lock:
+                self._entries.pop(key, None)
+        entry.set_result(result)
+        return result
+
+    def statistics(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
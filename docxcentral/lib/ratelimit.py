@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+    
+    gorazd.kikelj@gmail.com
+    
+"""
+from threading import Lock
+from time import monotonic, sleep
+from docxcentral.config import C_RATE_LIMIT_SECOND
+from docxcentral.logwriter import log_writer
+
+"""
+Aruba Central rate limit response headers
+
+X-RateLimit-Limit-second, X-RateLimit-Remaining-second
+X-RateLimit-Limit-day, X-RateLimit-Remaining-day
+
+"""
+
+
+def _header_int(headers: dict, name: str) -> int:
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Token bucket shared by all requests to one Aruba Central instance
+
+    Bucket refills with the per-second limit. Rate limit headers from each
+    response adjust the rate and drain the bucket when Central reports no
+    calls left in the current second.
+    """
+
+    def __init__(self, rate: float = C_RATE_LIMIT_SECOND) -> None:
+        self.rate = float(max(1, rate))
+        self.tokens = self.rate
+        self.updated = monotonic()
+        self.day_limit = None
+        self.day_remaining = None
+        self.requests = 0
+        self.waited = 0.0
+        self._lock = Lock()
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> None:
+        """
+        Block until the next request may be sent
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.requests += 1
+                    return None
+                delay = (1 - self.tokens) / self.rate
+                self.waited += delay
+            sleep(delay)
+
+    def update(self, headers: dict) -> None:
+        """
+        Adjust bucket from Central rate limit response headers
+        """
+        if not headers:
+            return None
+        headers = {str(key).lower(): value for key, value in headers.items()}
+        limit_second = _header_int(headers, "x-ratelimit-limit-second")
+        remaining_second = _header_int(headers, "x-ratelimit-remaining-second")
+        limit_day = _header_int(headers, "x-ratelimit-limit-day")
+        remaining_day = _header_int(headers, "x-ratelimit-remaining-day")
+
+        with self._lock:
+            self._refill()
+            if limit_second and limit_second != self.rate:
+                log_writer.debug(f"Central per-second rate limit is {limit_second}")
+                self.rate = float(limit_second)
+                self.tokens = min(self.tokens, self.rate)
+            if remaining_second is not None:
+                self.tokens = min(self.tokens, remaining_second)
+                if remaining_second == 0:
+                    # Wait a full second window before the next request
+                    self.tokens = min(self.tokens, 1 - self.rate)
+            if limit_day is not None:
+                self.day_limit = limit_day
+            if remaining_day is not None:
+                if remaining_day == 0 and self.day_remaining != 0:
+                    log_writer.error(
+                        f"Central daily API quota of {self.day_limit} is exhausted"
+                    )
+                self.day_remaining = remaining_day
+
+        return None
+
+    def statistics(self) -> dict:
+        return {
+            "rate": self.rate,
+            "requests": self.requests,
+            "waited": round(self.waited, 2),
+            "day_limit": self.day_limit,
+            "day_remaining": self.day_remaining,
+        }
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+    
+    gorazd.kikelj@gmail.com
+    
+    Replay Aruba Central API fixtures recorded with --record from a local
+    HTTP server.
+
+    Replay:
+        python -m docxcentral.lib.replay --fixtures data/fixtures --port 8080
+
+        central.json:
+        {
+            "base_url": "http://127.0.0.1:8080",
+            "token": {"access_token": "replay", "refresh_token": "replay"}
+        }
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from time import sleep
+from urllib.parse import urlparse, parse_qs, unquote
+from docxcentral.config import C_DATA_DIR, C_FIXTURES_DIR
+from docxcentral.logwriter import log_writer
+from docxcentral.lib.fixtures import fixture_key
+import argparse
+import copy
+import json
+import os
+import random
+
+"""
+Keys of paginated lists in Aruba Central responses and fields changed
+when items are cloned by scale-up.
+
+"""
+C_REPLAY_ITEMS_KEYS = ["aps", "sites", "devices", "subscriptions", "data"]
+C_REPLAY_CLONE_FIELDS = ["serial", "name", "site", "site_name"]
+C_REPLAY_CLONE_SEPARATOR = "~"
+C_REPLAY_PAGE_PARAMS = ["offset", "limit"]
+C_REPLAY_FILTER_PARAMS = ["site", "group", "serial"]
+
+
+def _items_key(body: any) -> str:
+    if not isinstance(body, dict):
+        return None
+    for key in C_REPLAY_ITEMS_KEYS:
+        if isinstance(body.get(key), list):
+            return key
+    return None
+
+
+def _strip_clone(value: str) -> tuple[str, int]:
+    """
+    Return original value and clone number. "AP01~3" -> ("AP01", 3)
+    """
+    base, separator, number = value.rpartition(C_REPLAY_CLONE_SEPARATOR)
+    if separator and number.isdigit():
+        return base, int(number)
+    return value, 0
+
+
+def _clone_item(item: dict, clone: int) -> dict:
+    if clone == 0 or not isinstance(item, dict):
+        return item
+    item = copy.deepcopy(item)
+    for field in C_REPLAY_CLONE_FIELDS:
+        if isinstance(item.get(field), str):
+            item[field] = f"{item[field]}{C_REPLAY_CLONE_SEPARATOR}{clone}"
+    return item
+
+
+class FixtureStore:
+    """
+    Recorded fixtures indexed for replay
+
+    Pages of the same list request are merged into one collection so the
+    replay can serve any offset/limit and scale the list up.
+    """
+
+    def __init__(self, directory: str, scale: int = 1) -> None:
+        self.scale = max(1, scale)
+        self.fixtures = {}
+        self.collections = {}
+        for filename in sorted(Path(directory).glob("*.json")):
+            with open(filename, "r", encoding="utf_8") as infile:
+                fixture = json.load(infile)
+            self.fixtures[
+                fixture_key(fixture["method"], fixture["apipath"], fixture["apiparams"])
+            ] = fixture
+            self._add_to_collection(fixture)
+        for collection in self.collections.values():
+            collection["pages"].sort(key=lambda page: page[0])
+            collection["items"] = []
+            for offset, items in collection.pop("pages"):
+                collection["items"].extend(items)
+        log_writer.info(
+            f"Loaded {len(self.fixtures)} fixtures and {len(self.collections)} lists from {directory}"
+        )
+
+    @staticmethod
+    def _collection_key(method: str, apipath: str, apiparams: dict) -> str:
+        params = {
+            key: value
+            for key, value in apiparams.items()
+            if key not in C_REPLAY_PAGE_PARAMS
+        }
+        return fixture_key(method, apipath, params)
+
+    def _add_to_collection(self, fixture: dict) -> None:
+        if fixture["code"] != 200 or "offset" not in fixture["apiparams"]:
+            return None
+        try:
+            body = json.loads(fixture["body"])
+        except ValueError:
+            return None
+        items_key = _items_key(body)
+        if items_key is None:
+            return None
+        key = self._collection_key(
+            fixture["method"], fixture["apipath"], fixture["apiparams"]
+        )
+        collection = self.collections.setdefault(
+            key, {"items_key": items_key, "body": body, "pages": []}
+        )
+        collection["pages"].append(
+            (int(fixture["apiparams"]["offset"]), body[items_key])
+        )
+        return None
+
+    def response(self, method: str, apipath: str, apiparams: dict) -> tuple:
+        """
+        Return (code, content type, body) for request
+        """
+        clone = 0
+        segments = []
+        for segment in apipath.split("/"):
+            segment, segment_clone = _strip_clone(segment)
+            clone = max(clone, segment_clone)
+            segments.append(segment)
+        apipath = "/".join(segments)
+        params = {}
+        for key, value in apiparams.items():
+            value, value_clone = _strip_clone(value)
+            clone = max(clone, value_clone)
+            params[key] = value
+
+        collection = self.collections.get(
+            self._collection_key(method, apipath, params)
+        )
+        if collection is not None:
+            filtered = any(key in params for key in C_REPLAY_FILTER_PARAMS)
+            return self._collection_response(collection, params, clone, filtered)
+
+        fixture = self.fixtures.get(fixture_key(method, apipath, params))
+        if fixture is None:
+            return 404, "application/json", json.dumps(
+                {"detail": f"No fixture for {method} {apipath} {params}"}
+            )
+        return fixture["code"], fixture["headers"].get("Content-Type"), fixture["body"]
+
+    def _collection_response(
+        self, collection: dict, params: dict, clone: int, filtered: bool
+    ) -> tuple:
+        if filtered:
+            # Request filtered by site, group, ... returns only its own clone
+            items = [_clone_item(item, clone) for item in collection["items"]]
+        else:
+            items = []
+            for number in range(self.scale):
+                items.extend(_clone_item(item, number) for item in collection["items"])
+
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 0)) or len(items)
+        page = items[offset : offset + limit]
+
+        body = dict(collection["body"])
+        body[collection["items_key"]] = page
+        body["count"] = len(page)
+        body["total"] = len(items)
+        return 200, "application/json", json.dumps(body)
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """
+    Serve fixtures with configured latency and injected errors
+    """
+
+    store: FixtureStore = None
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+
+    def log_message(self, format, *args) -> None:
+        log_writer.debug(format % args)
+
+    def _reply(self) -> None:
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        sleep(self.latency + random.uniform(0, self.jitter))
+
+        if random.random() < self.error_rate:
+            code, content_type, body = (
+                503,
+                "application/json",
+                json.dumps({"detail": "Injected error"}),
+            )
+        else:
+            try:
+                # fixtures keep paths as sent by pycentral, not percent-encoded
+                code, content_type, body = self.store.response(
+                    method=self.command, apipath=unquote(url.path), apiparams=params
+                )
+            except Exception as err:
+                log_writer.error(f"Replay failed for {self.path}: {err}")
+                code, content_type, body = (
+                    500,
+                    "application/json",
+                    json.dumps({"detail": str(err)}),
+                )
+
+        data = body.encode("utf_8")
+        self.send_response(code)
+        self.send_header("Content-Type", content_type or "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        self._reply()
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self._reply()
+
+
+def replay_server(
+    fixtures: str,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    scale: int = 1,
+) -> ThreadingHTTPServer:
+    """
+    Create replay HTTP server. Call serve_forever() to start it.
+    """
+    handler = type(
+        "ConfiguredReplayHandler",
+        (ReplayHandler,),
+        {
+            "store": FixtureStore(directory=fixtures, scale=scale),
+            "latency": latency,
+            "jitter": jitter,
+            "error_rate": error_rate,
+        },
+    )
+    handler.protocol_version = "HTTP/1.1"
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay recorded Aruba Central API responses"
+    )
+    parser.add_argument(
+        "--fixtures",
+        help=f"Fixture directory (default={C_DATA_DIR}{C_FIXTURES_DIR})",
+        default=os.path.join(C_DATA_DIR, C_FIXTURES_DIR),
+    )
+    parser.add_argument("--host", help="Listen address", default="127.0.0.1")
+    parser.add_argument("--port", help="Listen port", default=8080, type=int)
+    parser.add_argument(
+        "--latency", help="Response delay in seconds", default=0.0, type=float
+    )
+    parser.add_argument(
+        "--jitter", help="Random extra delay in seconds", default=0.0, type=float
+    )
+    parser.add_argument(
+        "--error_rate", help="Share of requests answered with 503", default=0.0, type=float
+    )
+    parser.add_argument(
+        "--scale", help="Clone sites and devices N times", default=1, type=int
+    )
+    args = parser.parse_args()
+
+    server = replay_server(
+        fixtures=args.fixtures,
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        scale=args.scale,
+    )
+    log_writer.info(f"Replaying {args.fixtures} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+    return None
+
+
+if __name__ == "__main__":
+    main()
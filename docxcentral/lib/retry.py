@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+    
+    gorazd.kikelj@gmail.com
+    
+"""
+from random import uniform
+from threading import Lock
+from docxcentral.config import (
+    C_GET_RETRY_COUNT,
+    C_RETRY_BACKOFF,
+    C_RETRY_BACKOFF_MAX,
+    C_RETRY_BUDGET,
+)
+from docxcentral.logwriter import log_writer
+
+"""
+Status code used by CentralClient when no HTTP response was received
+
+"""
+C_NETWORK_ERROR_CODE = 599
+
+C_RETRY_SERVER_ERRORS = [500, 502, 503, 504]
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter and a retry budget for the whole run
+
+    429        retried unless the daily quota is exhausted. Retry-After is honoured.
+    5xx        retried for 500, 502, 503 and 504.
+    network    retried (C_NETWORK_ERROR_CODE).
+    other      not retried.
+
+    Every retry takes one unit from the budget shared by all requests. When
+    the budget is spent, failures are returned to the caller immediately.
+    """
+
+    def __init__(
+        self,
+        retry_count: int = C_GET_RETRY_COUNT,
+        backoff: float = C_RETRY_BACKOFF,
+        backoff_max: float = C_RETRY_BACKOFF_MAX,
+        budget: int = C_RETRY_BUDGET,
+    ) -> None:
+        self.retry_count = retry_count
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.budget = budget
+        self.retries = {"429": 0, "5xx": 0, "network": 0}
+        self._lock = Lock()
+
+    def _backoff_delay(self, attempt: int) -> float:
+        return uniform(0, min(self.backoff_max, self.backoff * 2**attempt))
+
+    def _take_budget(self, kind: str) -> bool:
+        with self._lock:
+            if self.budget <= 0:
+                return False
+            self.budget -= 1
+            self.retries[kind] += 1
+            if self.budget == 0:
+                log_writer.error(
+                    "Retry budget exhausted. Failed requests are no longer retried."
+                )
+            return True
+
+    def retry_delay(self, result: dict, attempt: int) -> float:
+        """
+        Return delay in seconds before next attempt or None when not retried
+
+        Parameters:
+
+        result: dict
+            CentralClient.command result {"code": int, "msg": any, "headers": dict}
+
+        attempt: int
+            Number of retries already made for this request
+        """
+        code = result.get("code")
+        if code < 400 or attempt >= self.retry_count:
+            return None
+
+        headers = {
+            str(key).lower(): value for key, value in result.get("headers", {}).items()
+        }
+        delay = self._backoff_delay(attempt)
+        if code == 429:
+            if headers.get("x-ratelimit-remaining-day") == "0":
+                return None
+            kind = "429"
+            try:
+                delay = max(delay, float(headers.get("retry-after")))
+            except (TypeError, ValueError):
+                pass
+        elif code in C_RETRY_SERVER_ERRORS:
+            kind = "5xx"
+        elif code == C_NETWORK_ERROR_CODE:
+            kind = "network"
+        else:
+            return None
+
+        if not self._take_budget(kind):
+            return None
+        return min(delay, self.backoff_max)
+
+    def statistics(self) -> dict:
+        return {"retries": dict(self.retries), "budget_left": self.budget}
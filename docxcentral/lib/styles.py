@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+
+    gorazd.kikelj@gmail.com
+
+"""
+
+
+class StyleRegistry:
+    """
+    Style name to style id map of a document, built once from its styles
+
+    Names are python-docx (UI) style names as used by paragraph.style.
+    """
+
+    def __init__(self, document) -> None:
+        self._ids = {
+            style.name: style.style_id
+            for style in document.styles
+            if style.name is not None
+        }
+
+    def missing(self, names: list) -> list:
+        """
+        Return names without a style in the document
+        """
+        return [name for name in names if name not in self._ids]
+
+    def style_id(self, name: str) -> str:
+        """
+        Return style id of style name
+
+        Raise: KeyError when document has no style with name
+        """
+        try:
+            return self._ids[name]
+        except KeyError:
+            raise KeyError(f"no style with name '{name}'") from None
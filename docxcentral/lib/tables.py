@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+
+    gorazd.kikelj@gmail.com
+
+"""
+from copy import deepcopy
+from docx.oxml.ns import qn
+from docx.table import _Cell
+from .styles import StyleRegistry
+
+_T = qn("w:t")
+_XML_SPACE = qn("xml:space")
+
+
+class TableBuilder:
+    """
+    Append rows to python-docx table from a prototype row
+
+    The prototype row is built once with python-docx (cell widths, merged
+    cells, paragraph styles) and removed from the table. Every row is a copy
+    of the prototype with text set, so table grid is not walked for every
+    row as with table.add_row().cells. Text is set as by cell.text.
+
+    Parameters:
+
+        table: docx.table.Table
+
+        styles: list
+            Paragraph style name of every cell of the row, None for default
+
+        widths: list
+            Width of every cell, None keeps the grid column width
+
+        spans: list
+            Number of grid columns of every cell, default one per column
+
+        registry: StyleRegistry
+            Resolves style names to style ids, default built from the document
+    """
+
+    def __init__(
+        self,
+        table,
+        styles: list,
+        widths: list = None,
+        spans: list = None,
+        registry: StyleRegistry = None,
+    ) -> None:
+        if registry is None:
+            registry = StyleRegistry(table.part.document)
+        self.table = table
+        row = table.add_row()
+        if spans is not None:
+            cells = row.cells
+            column = 0
+            for span in spans:
+                if span > 1:
+                    cells[column].merge(cells[column + span - 1])
+                column += span
+        self._tr = row._tr
+        for idx, tc in enumerate(self._tr.tc_lst):
+            tc.clear_content()
+            p = tc.add_p()
+            if styles[idx] is not None:
+                p.style = registry.style_id(styles[idx])
+            p.add_r().add_t("")
+            if widths is not None and widths[idx] is not None:
+                tc.width = widths[idx]
+        table._tbl.remove(self._tr)
+
+    def add_row(self, values: list) -> list:
+        """
+        Append row with one text value for every cell
+
+        Return: list of cells of the new row
+        """
+        tr = deepcopy(self._tr)
+        for t, value in zip(list(tr.iter(_T)), values):
+            if isinstance(value, str) and value and not any(
+                char in value for char in "\t\r\n"
+            ):
+                t.text = value
+                if len(value.strip()) < len(value):
+                    t.set(_XML_SPACE, "preserve")
+                continue
+            r = t.getparent()
+            r.remove(t)
+            r.text = value
+        self.table._tbl.append(tr)
+        return [_Cell(tc, self.table) for tc in tr.tc_lst]
+
+    def add_rows(self, rows: list) -> list:
+        """
+        Append all rows
+
+        Return: list of cells of the new rows
+        """
+        return [self.add_row(values) for values in rows]
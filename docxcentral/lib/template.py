@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+
+    gorazd.kikelj@gmail.com
+
+"""
+from copy import deepcopy
+from threading import Lock
+from docx import Document
+from .styles import StyleRegistry
+
+
+"""
+Cached python-docx properties that hold XML elements. lxml elements ignore
+the deepcopy memo, so copies of these would point into the source package.
+
+"""
+_ELEMENT_PROPERTIES = ("inline_shapes", "numbering_definitions")
+
+
+def copy_document(document):
+    """
+    Return independent copy of python-docx document without reparsing it
+    """
+    package = deepcopy(document.part.package)
+    for part in package.iter_parts():
+        for name in _ELEMENT_PROPERTIES:
+            part.__dict__.pop(name, None)
+    return package.main_document_part.document
+
+
+class TemplateCache:
+    """
+    Template document parsed once and handed out as independent copies
+
+    With render_cover the cover page is rendered once into a prototype
+    document by render_cover(document=document, item=""). Copies of the
+    prototype get only the title paragraph set. Style registry of the
+    template is built when template is loaded.
+    """
+
+    def __init__(self, filename: str, render_cover=None) -> None:
+        self.filename = filename
+        self.render_cover = render_cover
+        self._template = None
+        self._styles = None
+        self._prototype = None
+        self._title_idx = None
+        self._lock = Lock()
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._template is not None:
+                return None
+            template = Document(self.filename)
+            self._styles = StyleRegistry(template)
+            self._template = template
+        return None
+
+    def _load_prototype(self) -> None:
+        with self._lock:
+            if self._prototype is not None:
+                return None
+            prototype = copy_document(self._template)
+            self._title_idx = len(prototype.paragraphs)
+            self.render_cover(document=prototype, item="")
+            self._prototype = prototype
+        return None
+
+    @property
+    def styles(self) -> StyleRegistry:
+        """
+        Style registry of the template
+        """
+        self._load()
+        return self._styles
+
+    def document(self, title: str = None):
+        """
+        Return new document. With title it starts with the cover page.
+        """
+        self._load()
+        if title is None or self.render_cover is None:
+            return copy_document(self._template)
+        self._load_prototype()
+        document = copy_document(self._prototype)
+        document.paragraphs[self._title_idx].text = title
+        return document
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+    Author: Gorazd Kikelj
+    
+    gorazd.kikelj@gmail.com
+    
+"""
+from time import time
+from docxcentral.logwriter import log_writer
+import json
+import os
+
+"""
+Aruba Central access token file helpers
+
+Token is stored as returned by OAuth API with added "created_at" timestamp.
+{
+    "access_token": "",
+    "refresh_token": "",
+    "expires_in": 7200,
+    "created_at": 1700000000.0
+}
+
+"""
+
+
+def read_token(filename: str) -> dict:
+    """
+    Return token from file or None. Missing created_at is taken from file time.
+    """
+    try:
+        with open(filename, "r", encoding="utf_8") as infile:
+            token = json.load(infile)
+        if token and "created_at" not in token:
+            token["created_at"] = os.path.getmtime(filename)
+    except (OSError, ValueError) as err:
+        log_writer.debug(f"Unable to read token from {filename}: {err}")
+        return None
+    return token or None
+
+
+def write_token(filename: str, token: dict) -> bool:
+    """
+    Atomically replace token file
+    """
+    token = dict(token)
+    token.setdefault("created_at", time())
+    tmp_filename = f"{filename}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        with open(tmp_filename, "w", encoding="utf_8") as outfile:
+            json.dump(token, outfile, indent=2)
+        os.replace(tmp_filename, filename)
+    except OSError as err:
+        log_writer.error(f"Storing token failed with error {err}")
+        return False
+    return True
+
+
+def token_expiring(token: dict, margin: float) -> bool:
+    """
+    True when token expires within margin seconds. Tokens without expiry
+    information never expire here and are refreshed on 401 only.
+    """
+    if not token or "expires_in" not in token or "created_at" not in token:
+        return False
+    try:
+        expires = float(token["created_at"]) + float(token["expires_in"])
+    except (TypeError, ValueError):
+        return False
+    return time() > expires - margin
@@ -7,9 +7,13 @@
 """
 from encodings import utf_8
 import os
+import base64
+import hashlib
+import threading
 import json
 import sys
 import csv
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 from dateutil import parser
@@ -17,6 +21,12 @@ from icecream import ic
 from docxcentral import C_TIMESTAMPS
 from docxcentral.logwriter import log_writer
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 
 def parse_str(str, dict, sep=","):
     toks = str.split(sep)
@@ -178,6 +188,128 @@ def check_path(path: str) -> None:
     return None
 
 
+@contextmanager
+def file_lock(filename: str):
+    """
+    Exclusive lock shared by threads and processes.
+
+    Lock is held on separate file filename.lock so filename itself can be
+    replaced while locked.
+
+    Parameters:
+
+        filename: str
+            File to protect
+    """
+    lock_filename = f"{filename}.lock"
+    Path(lock_filename).parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_filename, "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def file_sha256(filename: str, chunk_size: int = 65536) -> str:
+    """
+    Return sha256 hexdigest of file content or None when file does not exist
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(filename, "rb") as infile:
+            for chunk in iter(lambda: infile.read(chunk_size), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def save_base64_stream(chunks, filename: str, signatures: tuple = None) -> bool:
+    """
+    Decode base64 text chunks straight into file.
+
+    Text can be quoted as JSON string. Decoded data is written to a temporary
+    file, which is read back and compared with sha256 computed while decoding.
+    This catches write errors only, there is no checksum of the download to
+    verify against. Existing file is replaced only when its content is
+    different.
+
+    Return: True when file was written, False when content is unchanged
+
+    Raise: ValueError when data is not valid base64, does not start with one
+    of signatures or file was not written correctly
+
+    Parameters:
+
+        chunks: iterable
+            bytes chunks of base64 text, e.g. requests.Response.iter_content()
+
+        filename: str
+            Output file
+
+        signatures: tuple
+            Accepted leading bytes of decoded data, e.g. image file signatures
+    """
+    digest = hashlib.sha256()
+    tmp_filename = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+    escape = b""
+    pending = b""
+    head = b""
+    try:
+        with open(tmp_filename, "wb") as outfile:
+            for chunk in chunks:
+                chunk = escape + chunk
+                escape = b""
+                if chunk.endswith(b"\\"):
+                    chunk, escape = chunk[:-1], chunk[-1:]
+                chunk = (
+                    chunk.replace(b"\\/", b"/")
+                    .replace(b"\\n", b"")
+                    .replace(b"\\r", b"")
+                    .translate(None, b'" \t\r\n')
+                )
+                chunk = pending + chunk
+                split = len(chunk) - len(chunk) % 4
+                chunk, pending = chunk[:split], chunk[split:]
+                data = base64.b64decode(chunk, validate=True)
+                if signatures and len(head) < 16:
+                    head += data[: 16 - len(head)]
+                digest.update(data)
+                outfile.write(data)
+            if pending or escape:
+                raise ValueError("Incomplete base64 data")
+        if signatures and not head.startswith(signatures):
+            raise ValueError(f"Unexpected content for {filename}")
+
+        if file_sha256(tmp_filename) != digest.hexdigest():
+            raise ValueError(f"Write verification failed for {filename}")
+        if file_sha256(filename) == digest.hexdigest():
+            os.remove(tmp_filename)
+            return False
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+
+    return True
+
+
 def create_filename(directory: str, filename: str) -> str:
     """
     Compose the full file path.
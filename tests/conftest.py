@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+docxcentral reads logconfig.json and writes log/ in the working directory
+when it is imported, so tests run in a scratch working directory.
+"""
+from pathlib import Path
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+_workdir = tempfile.mkdtemp(prefix="docxcentral-tests-")
+shutil.copy(ROOT / "docxcentral" / "templates" / "logconfig.json", _workdir)
+os.chdir(_workdir)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+AssetIndex matches AP images and BOM documents as the glob patterns did
+"""
+import glob
+import os
+
+from docxcentral.lib.assets import AssetIndex
+
+IMAGES = [
+    "SN1-AP1.jpg",
+    "SN1.jpg",
+    "SN1_front.jpg",
+    "SN1-AP1.JPG",
+    "SN1-AP1.jpeg",
+    "SN1-AP1_location.png",
+    "SN1_location.png",
+    "SN1-AP1_LOCATION.png",
+    "SN10-AP10.jpg",
+    "SN10-AP10_location.png",
+    "XSN1-AP1.jpg",
+]
+
+
+def make_tree(root) -> AssetIndex:
+    site = root / "images" / "Site1"
+    site.mkdir(parents=True)
+    for name in IMAGES:
+        (site / name).write_bytes(b"image")
+    (site / "SN1-dir.jpg").mkdir()
+    bom = root / "bom"
+    bom.mkdir()
+    for name in ["Site1 BOM.docx", "Site10 BOM.docx", "Site1 BOM.DOCX"]:
+        (bom / name).write_bytes(b"bom")
+    return AssetIndex(images_dir=f"{root}/images/", bom_dir=f"{root}/bom/")
+
+
+def files(pattern: str) -> list:
+    return sorted(filter(os.path.isfile, glob.glob(pattern)))
+
+
+def test_images_match_glob_patterns(tmp_path):
+    index = make_tree(tmp_path)
+    images = f"{tmp_path}/images/Site1"
+    for serial in ["SN1", "SN10", "SN2"]:
+        assert index.ap_photos(site="Site1", serial=serial) == files(
+            f"{images}/{serial}*.jpg"
+        )
+        assert index.ap_locations(site="Site1", serial=serial) == files(
+            f"{images}/{serial}-*_location.png"
+        )
+    assert index.ap_photos(site="Site2", serial="SN1") == []
+
+
+def test_bom_belongs_to_longest_site_name(tmp_path):
+    index = make_tree(tmp_path)
+    bom = f"{tmp_path}/bom"
+    assert index.bom_files(site_name="Site1") == [
+        f"{bom}/Site1 BOM.docx",
+        f"{bom}/Site10 BOM.docx",
+    ]
+    index.assign_bom(site_names=["Site1", "Site10"])
+    assert index.bom_files(site_name="Site1") == [f"{bom}/Site1 BOM.docx"]
+    assert index.bom_files(site_name="Site10") == [f"{bom}/Site10 BOM.docx"]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Decode base64 downloads into files
+"""
+import base64
+import json
+
+import pytest
+
+from docxcentral.lib.utilities import save_base64_stream
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 8
+
+
+def chunks(data: bytes, size: int = 7) -> list:
+    text = json.dumps(base64.b64encode(data).decode()).encode()
+    return [text[idx : idx + size] for idx in range(0, len(text), size)]
+
+
+def test_decoded_file_is_replaced_only_when_changed(tmp_path):
+    filename = tmp_path / "floor.png"
+    assert save_base64_stream(chunks(PNG), str(filename), signatures=(b"\x89PNG",))
+    assert filename.read_bytes() == PNG
+    assert not save_base64_stream(chunks(PNG), str(filename))
+
+
+def test_unexpected_content_is_rejected(tmp_path):
+    filename = tmp_path / "floor.png"
+    with pytest.raises(ValueError):
+        save_base64_stream(chunks(b"<html>error</html>"), str(filename), (b"\x89PNG",))
+    assert list(tmp_path.iterdir()) == []
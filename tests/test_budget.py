@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Daily API call budget shared by runs
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+
+from docxcentral.lib.budget import CallBudget
+
+
+def test_concurrent_calls_are_all_counted(tmp_path):
+    budget = CallBudget(directory=str(tmp_path), tenant="t", flush_calls=7)
+
+    def count(idx: int) -> None:
+        budget.count(f"/configuration/v1/ap_settings_cli/SN{idx}")
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        list(executor.map(count, range(1000)))
+    budget.flush(last_run=True)
+
+    state = json.loads(next(tmp_path.glob("*.json")).read_text())
+    assert state["total"] == 1000
+    assert state["calls"] == {"/configuration/v1/ap_settings_cli": 1000}
+    assert state["last_run"] == 1000
+    assert budget.statistics()["today"] == 1000
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+AP details reused by incremental runs
+"""
+from types import SimpleNamespace
+
+from docxcentral.lib import central as central_module, devicestore
+from docxcentral.lib.devicestore import DeviceStore, device_fingerprint
+
+AP = {"serial": "SN1", "name": "AP1", "group_name": "g1", "last_modified": 1}
+
+
+def ap_details(central, monkeypatch, group_cli: list, calls: list) -> dict:
+    def get_group_ap_cli(central, group_name) -> list:
+        calls.append(group_name)
+        return group_cli
+
+    def get_per_ap_settings(central, serial_no) -> list:
+        calls.append(serial_no)
+        return ["hostname AP1"]
+
+    monkeypatch.setattr(central_module, "get_group_ap_cli", get_group_ap_cli)
+    monkeypatch.setattr(central_module, "get_per_ap_settings", get_per_ap_settings)
+    return central_module.get_ap_details(
+        central=central,
+        serial_list=["SN1"],
+        fingerprints={"SN1": device_fingerprint(AP)},
+        groups={"SN1": "g1"},
+    )
+
+
+def test_group_config_change_refetches_details(tmp_path, monkeypatch):
+    central = SimpleNamespace(device_store=DeviceStore(directory=str(tmp_path)))
+    calls = []
+    first = ap_details(central, monkeypatch, ["wlan ssid-profile a"], calls)
+    assert ap_details(central, monkeypatch, ["wlan ssid-profile a"], calls) == first
+    assert calls == ["g1", "SN1", "g1"]
+
+    changed = ap_details(central, monkeypatch, ["wlan ssid-profile b"], calls)
+    assert calls[-1] == "SN1"
+    assert changed["SN1"]["configuration"] == "wlan ssid-profile b\nhostname AP1\n"
+    assert central.device_store.statistics() == {"reused": 1, "fetched": 2}
+
+
+def test_old_details_are_refetched(tmp_path, monkeypatch):
+    store = DeviceStore(directory=str(tmp_path), max_age=60)
+    monkeypatch.setattr(devicestore, "time", lambda: 1000.0)
+    store.put("SN1", "fp", {"settings": []})
+    assert store.get("SN1", "fp") == {"settings": []}
+
+    monkeypatch.setattr(devicestore, "time", lambda: 1061.0)
+    assert store.get("SN1", "fp") is None
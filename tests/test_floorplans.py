@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Crawl VisualRF floor plans
+"""
+from docxcentral.lib import central as central_module
+
+BUILDINGS = {
+    "c1": {"buildings": [{"building_id": "b1", "building_name": "North"}]},
+    "c2": {"buildings": [{"building_id": "b2", "building_name": "South"}]},
+}
+FLOORS = {
+    "b1": {"floors": [{"floor_id": "f1", "floor_name": "Ground", "floor_level": 0}]},
+    "b2": {"floors": [{"floor_id": "f2", "floor_name": "Ground", "floor_level": 0}]},
+}
+FLOOR_DATA = {
+    "f1": {"access_points": [{"ap_name": "AP1", "ap_id": "a1"}]},
+    "f2": "404 page not found",
+}
+
+
+def test_crawl_floorplans_keeps_floors_with_same_name(monkeypatch):
+    monkeypatch.setattr(
+        central_module,
+        "get_campus_id",
+        lambda central: {"campus": [{"campus_id": "c1"}, {"campus_id": "c2"}]},
+    )
+    monkeypatch.setattr(
+        central_module,
+        "get_buildings",
+        lambda central, campus_id: BUILDINGS[campus_id],
+    )
+    monkeypatch.setattr(
+        central_module,
+        "get_floors",
+        lambda central, building_id: FLOORS[building_id],
+    )
+    monkeypatch.setattr(
+        central_module,
+        "get_floor_data",
+        lambda central, floor_id: FLOOR_DATA[floor_id],
+    )
+    monkeypatch.setattr(central_module, "save_floor_image", lambda **kwargs: True)
+
+    floor_dict, timings = central_module.crawl_floorplans(central=None, jobs=2)
+
+    assert floor_dict == {
+        "f1": {"building_name": "North", "floor_name": "Ground", "ap": {"AP1": "a1"}},
+        "f2": {"building_name": "South", "floor_name": "Ground", "ap": {}},
+    }
+    assert sorted(timings) == ["f1", "f2"]
+
+
+def test_crawl_floorplans_skips_failed_calls(monkeypatch):
+    monkeypatch.setattr(central_module, "get_campus_id", lambda central: "error")
+    assert central_module.crawl_floorplans(central=None) == ({}, {})
+
+
+def test_crawl_floorplans_skips_failed_floor(monkeypatch):
+    floors = {
+        "b1": {
+            "floors": [
+                {"floor_id": "f1", "floor_name": "Ground", "floor_level": 0},
+                {"floor_id": "f3", "floor_name": "Roof"},
+            ]
+        }
+    }
+    monkeypatch.setattr(
+        central_module, "get_campus_id", lambda central: {"campus": [{"campus_id": "c1"}]}
+    )
+    monkeypatch.setattr(
+        central_module, "get_buildings", lambda central, campus_id: BUILDINGS[campus_id]
+    )
+    monkeypatch.setattr(
+        central_module, "get_floors", lambda central, building_id: floors[building_id]
+    )
+    monkeypatch.setattr(
+        central_module, "get_floor_data", lambda central, floor_id: FLOOR_DATA[floor_id]
+    )
+    monkeypatch.setattr(central_module, "save_floor_image", lambda **kwargs: True)
+
+    floor_dict, timings = central_module.crawl_floorplans(central=None, jobs=2)
+
+    assert floor_dict == {
+        "f1": {"building_name": "North", "floor_name": "Ground", "ap": {"AP1": "a1"}}
+    }
+    assert list(timings) == ["f1"]
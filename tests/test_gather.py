@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Run Aruba Central calls concurrently
+"""
+from docxcentral.lib.central import gather_central_calls
+
+
+def get_value(value: int) -> int:
+    return value
+
+
+def get_broken(value: int) -> int:
+    raise ConnectionError(f"lost {value}")
+
+
+def get_missing(value: int) -> int:
+    return {}[value]
+
+
+def test_failed_call_keeps_other_results():
+    results = gather_central_calls(
+        calls=[
+            (get_value, {"value": 1}),
+            (get_broken, {"value": 2}),
+            (get_value, {"value": 3}),
+        ],
+        jobs=2,
+    )
+    assert results[0] == 1
+    assert results[2] == 3
+    assert results[1] == {"detail": "get_broken failed: ConnectionError('lost 2')"}
+
+
+def test_programming_error_is_not_network_error(caplog):
+    results = gather_central_calls(calls=[(get_missing, {"value": 1})])
+    assert results == [{"detail": "get_missing raised KeyError(1)"}]
+    records = [r for r in caplog.records if "get_missing" in r.getMessage()]
+    assert records and "599" not in records[0].getMessage()
+    assert records[0].exc_info[0] is KeyError
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental JSON decoding of chunked responses
+"""
+import json
+
+import pytest
+
+from docxcentral.lib import jsondecode
+
+DOCUMENT = {
+    "x": 1.5,
+    "count": 3,
+    "aps": [{"serial": "SN1", "gain": -2.5e-3}, 10, 1e2, "ž", True, None, []],
+    "total": 12,
+    "ok": False,
+}
+
+
+@pytest.fixture(params=["ijson", "raw_decode"])
+def backend(request, monkeypatch):
+    if request.param == "ijson":
+        pytest.importorskip("ijson")
+    else:
+        monkeypatch.setattr(jsondecode, "ijson", None)
+    return request.param
+
+
+def items(data: bytes, sizes: list) -> tuple:
+    chunks = []
+    start = 0
+    for size in sizes:
+        chunks.append(data[start : start + size])
+        start += size
+    chunks.append(data[start:])
+    meta = {}
+    return list(jsondecode.iter_json_items(chunks, "aps", meta)), meta
+
+
+@pytest.mark.parametrize("separators", [(", ", ": "), (",", ":")])
+def test_every_split_offset(backend, separators):
+    data = json.dumps(DOCUMENT, separators=separators, ensure_ascii=False).encode()
+    expected = (
+        DOCUMENT["aps"],
+        {key: value for key, value in DOCUMENT.items() if key != "aps"},
+    )
+    for offset in range(len(data) + 1):
+        assert items(data, [offset]) == expected, offset
+    for size in (1, 2):
+        assert items(data, [size] * len(data)) == expected, size
+
+
+def test_invalid_document(backend):
+    with pytest.raises(ValueError):
+        list(jsondecode.iter_json_items([b'{"aps": [1.}'], "aps"))
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""
+Run scoped memo of API responses
+"""
+from docxcentral.lib.memo import RequestMemo
+
+
+def test_excluded_paths_are_not_remembered():
+    memo = RequestMemo(exclude=["/monitoring/v2/aps"])
+    calls = []
+
+    def func() -> dict:
+        calls.append(1)
+        return {"code": 200, "msg": {"aps": []}, "headers": {}}
+
+    for apipath in ["/monitoring/v2/aps", "/monitoring/v2/aps", "/central/v2/sites"]:
+        memo.call(method="GET", apipath=apipath, apiparams={}, func=func)
+    memo.call(method="GET", apipath="/central/v2/sites", apiparams={}, func=func)
+    assert len(calls) == 3
+    assert memo.statistics()["hits"] == 1
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Record streamed Aruba Central responses and replay them from the fixtures
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import parse_qs, unquote, urlparse
+import base64
+import json
+
+from docxcentral.lib.central import (
+    connect_to_central,
+    get_wlan_list,
+    iter_central_items,
+    save_floor_image,
+)
+from docxcentral.lib.replay import replay_server
+
+APS = [{"serial": f"SN{idx:04}", "name": f"AP{idx}"} for idx in range(25)]
+FLOOR_IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 40
+WLANS = {"description": {"wlans": ["Guest", "Staff"]}}
+
+
+class FakeCentral(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        query = {key: value[0] for key, value in parse_qs(url.query).items()}
+        if unquote(url.path) == "/configuration/full_wlan/Main Campus":
+            body = json.dumps(WLANS).encode()
+        elif url.path == "/visualrf_api/v1/floor/f1/image":
+            body = json.dumps(base64.b64encode(FLOOR_IMAGE).decode()).encode()
+        elif url.path == "/monitoring/v2/aps":
+            offset = int(query.get("offset", 0))
+            limit = int(query.get("limit", 10))
+            aps = APS[offset : offset + limit]
+            body = json.dumps({"aps": aps, "count": len(aps), "total": len(APS)})
+            body = body.encode()
+        else:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return None
+
+
+def serve(server) -> str:
+    Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def central_client(base_url: str, tmp_path, record_dir: str = None):
+    return connect_to_central(
+        central_info={
+            "base_url": base_url,
+            "customer_id": "test",
+            "token": {"access_token": "test", "refresh_token": "test"},
+        },
+        options={
+            "cache": False,
+            "retry_count": 0,
+            "budget_dir": str(tmp_path / "budget"),
+            "daily_budget": 0,
+            "record_dir": record_dir,
+        },
+    )
+
+
+def streamed_aps(central) -> list:
+    return list(
+        iter_central_items(
+            central=central, apipath="/monitoring/v2/aps", items_key="aps", limit=10
+        )
+    )
+
+
+def floor_image(central, filename) -> bytes:
+    assert save_floor_image(central=central, floor_id="f1", filename=str(filename))
+    return filename.read_bytes()
+
+
+def test_streamed_responses_are_recorded_and_replayed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fixtures = tmp_path / "fixtures"
+
+    fake = ThreadingHTTPServer(("127.0.0.1", 0), FakeCentral)
+    try:
+        central = central_client(serve(fake), tmp_path, record_dir=str(fixtures))
+        assert streamed_aps(central) == APS
+        assert floor_image(central, tmp_path / "recorded.png") == FLOOR_IMAGE
+    finally:
+        fake.shutdown()
+    assert central.recorder.recorded == 4
+
+    replay = replay_server(fixtures=str(fixtures), port=0)
+    try:
+        central = central_client(serve(replay), tmp_path)
+        assert streamed_aps(central) == APS
+        assert floor_image(central, tmp_path / "replayed.png") == FLOOR_IMAGE
+    finally:
+        replay.shutdown()
+
+
+def test_path_with_space_is_replayed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fixtures = tmp_path / "fixtures"
+
+    fake = ThreadingHTTPServer(("127.0.0.1", 0), FakeCentral)
+    try:
+        central = central_client(serve(fake), tmp_path, record_dir=str(fixtures))
+        assert get_wlan_list(central=central, group_name="Main Campus") == WLANS[
+            "description"
+        ]
+    finally:
+        fake.shutdown()
+
+    replay = replay_server(fixtures=str(fixtures), port=0)
+    try:
+        central = central_client(serve(replay), tmp_path)
+        assert get_wlan_list(central=central, group_name="Main Campus") == WLANS[
+            "description"
+        ]
+    finally:
+        replay.shutdown()